@@ -0,0 +1,86 @@
+import os
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Any, Dict
+
+# Torch and bcrypt release the GIL, so worker threads are enough to keep them
+# off the event loop; the pool sizes bound how many run at the same time.
+INFERENCE_CONCURRENCY = int(os.getenv("INFERENCE_CONCURRENCY", 1))
+CRYPTO_CONCURRENCY = int(os.getenv("CRYPTO_CONCURRENCY", 4))
+
+class BoundedExecutor:
+    """Thread pool with a fixed number of workers that tracks its own queue depth."""
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.max_queue_depth = 0
+        self.total_wait_seconds = 0.0
+
+    def _job(self, fn: Callable[..., Any], *args, **kwargs) -> Callable[[], Any]:
+        enqueued_at = time.perf_counter()
+        with self._lock:
+            self.queued += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queued)
+
+        def job():
+            with self._lock:
+                self.queued -= 1
+                self.running += 1
+                self.total_wait_seconds += time.perf_counter() - enqueued_at
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.completed += 1
+
+        return job
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, self._job(fn, *args, **kwargs))
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Blocking variant of run() for code that already runs on a worker thread (never call it from this pool)."""
+        return self._pool.submit(self._job(fn, *args, **kwargs)).result()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            started = self.completed + self.running
+            return {
+                "max_workers": self.max_workers,
+                "queue_depth": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "max_queue_depth": self.max_queue_depth,
+                "avg_wait_ms": round(self.total_wait_seconds / started * 1000, 1) if started else 0.0,
+            }
+
+inference_executor = BoundedExecutor("inference", INFERENCE_CONCURRENCY)
+crypto_executor = BoundedExecutor("crypto", CRYPTO_CONCURRENCY)
+
+async def run_inference(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Runs a blocking model call (torch / SentenceTransformer) off the event loop."""
+    return await inference_executor.run(fn, *args, **kwargs)
+
+def call_inference(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Runs a model call on the inference pool from a worker thread, e.g. inside asyncio.to_thread."""
+    return inference_executor.call(fn, *args, **kwargs)
+
+async def run_crypto(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Runs a blocking password hash / verify off the event loop."""
+    return await crypto_executor.run(fn, *args, **kwargs)
+
+def executor_stats() -> Dict[str, Any]:
+    return {
+        inference_executor.name: inference_executor.stats(),
+        crypto_executor.name: crypto_executor.stats(),
+    }
@@ -0,0 +1,59 @@
+"""
+Fills news.canonical_url for rows stored before URL canonicalisation existed.
+Later duplicates of an already-canonicalised article are reported and left empty.
+
+Usage (from the backend directory, after running db/sql/canonical_urls.sql):
+    python -m db.backfill_canonical_urls
+"""
+from db.supabase import supabase
+from utils.url_utils import canonicalize_url
+
+PAGE_SIZE = 500
+
+def main():
+    seen = {}
+    # Paginated like the main loop: PostgREST caps a single select at 1000 rows
+    start = 0
+    while True:
+        res = supabase.table("news") \
+            .select("id, canonical_url") \
+            .not_.is_("canonical_url", "null") \
+            .order("id") \
+            .range(start, start + PAGE_SIZE - 1) \
+            .execute()
+        rows = res.data
+        if not rows:
+            break
+        for row in rows:
+            seen[row["canonical_url"]] = row["id"]
+        start += len(rows)
+
+    updated = duplicates = 0
+    start = 0
+    while True:
+        res = supabase.table("news") \
+            .select("id, link_article") \
+            .is_("canonical_url", "null") \
+            .order("id") \
+            .range(start, start + PAGE_SIZE - 1) \
+            .execute()
+        rows = res.data
+        if not rows:
+            break
+        for row in rows:
+            canonical = canonicalize_url(row.get("link_article") or "")
+            if not canonical:
+                start += 1
+                continue
+            if canonical in seen:
+                print(f"⚠️ News #{row['id']} duplicates #{seen[canonical]} ({canonical})")
+                duplicates += 1
+                start += 1
+                continue
+            supabase.table("news").update({"canonical_url": canonical}).eq("id", row["id"]).execute()
+            seen[canonical] = row["id"]
+            updated += 1
+    print(f"✅ {updated} rows updated, {duplicates} duplicates left without canonical_url")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""
+Fills news.minhash for rows stored before near-duplicate detection existed and flags
+later republications of an article with news.duplicate_of, oldest article first.
+
+Usage (from the backend directory, after running db/sql/near_duplicates.sql):
+    python -m db.backfill_minhash
+"""
+from db.supabase import supabase
+from services.duplicate_index import mark_near_duplicates
+from utils.minhash import text_signature
+
+PAGE_SIZE = 500
+
+def main():
+    updated = duplicates = 0
+    while True:
+        res = supabase.table("news") \
+            .select("id, content") \
+            .is_("minhash", "null") \
+            .order("id") \
+            .limit(PAGE_SIZE) \
+            .execute()
+        rows = res.data
+        if not rows:
+            break
+        for row in rows:
+            # Too-short texts get an empty signature so they are not picked up again
+            row["minhash"] = text_signature(row.get("content") or "") or ""
+            supabase.table("news").update({"minhash": row["minhash"]}).eq("id", row["id"]).execute()
+            updated += 1
+        duplicates += len(mark_near_duplicates(rows))
+    print(f"✅ {updated} rows updated, {duplicates} near-duplicates flagged")
+
+if __name__ == "__main__":
+    main()
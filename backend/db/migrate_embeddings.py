@@ -0,0 +1,60 @@
+"""
+Fills the compact embedding columns from the existing vector columns.
+
+Usage (from the backend directory, after running db/sql/compact_embeddings.sql):
+    python -m db.migrate_embeddings --format f16
+"""
+import argparse
+from db.supabase import supabase
+from services.centroid_index import to_vector
+from utils.embedding_codec import encode_embedding
+
+TABLES = [
+    # (table, vector column, compact column)
+    ("news", "embedding", "embedding_compact"),
+    ("issues", "centroid_embedding", "centroid_compact"),
+]
+
+def migrate_table(table: str, source: str, target: str, fmt: str, page_size: int) -> int:
+    converted = 0
+    start = 0
+    while True:
+        res = supabase.table(table) \
+            .select(f"id, {source}") \
+            .not_.is_(source, "null") \
+            .order("id") \
+            .range(start, start + page_size - 1) \
+            .execute()
+        rows = res.data
+        if not rows:
+            break
+
+        updated = []
+        for row in rows:
+            vector = to_vector(row.get(source))
+            if vector is None:
+                print(f"⚠️ Skipping {table} #{row['id']}: unreadable {source}")
+                continue
+            updated.append((row["id"], encode_embedding(vector, fmt)))
+
+        # Only the compact column is written, so concurrent edits to other columns are kept
+        for row_id, compact in updated:
+            supabase.table(table).update({target: compact}).eq("id", row_id).execute()
+        converted += len(updated)
+        print(f"   {table}: {converted} rows converted")
+        start += page_size
+    return converted
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert stored embeddings to the compact base64 format.")
+    parser.add_argument("--format", choices=["f16", "f32"], default="f16")
+    parser.add_argument("--page-size", type=int, default=200)
+    args = parser.parse_args()
+
+    for table, source, target in TABLES:
+        print(f"🔄 Converting {table}.{source} -> {table}.{target} ({args.format})")
+        total = migrate_table(table, source, target, args.format, args.page_size)
+        print(f"✅ {table}: {total} rows converted")
+
+if __name__ == "__main__":
+    main()
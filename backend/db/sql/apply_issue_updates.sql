@@ -0,0 +1,16 @@
+-- Applies the issue counter deltas and centroids gathered during one clustering run.
+-- Counters are incremented in place so concurrent runs never lose increments.
+-- Run once in the Supabase SQL editor (after compact_embeddings.sql and news_issues_unique.sql,
+-- whose constraint the news_issues upsert relies on); called from services/clustering.py.
+create or replace function apply_issue_updates(updates jsonb)
+returns void
+language sql
+as $$
+    update issues i
+    set news_count = coalesce(i.news_count, 0) + coalesce(u.news_count_delta, 0),
+        centroid_embedding = coalesce(u.centroid_embedding::text::vector, i.centroid_embedding),
+        centroid_compact = coalesce(u.centroid_compact, i.centroid_compact),
+        timemodified = now()
+    from jsonb_to_recordset(updates) as u(id bigint, news_count_delta int, centroid_embedding jsonb, centroid_compact text)
+    where i.id = u.id;
+$$;
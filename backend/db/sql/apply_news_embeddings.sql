@@ -0,0 +1,13 @@
+-- Writes the embeddings generated during one clustering run, touching only the embedding
+-- columns so concurrent edits to other news columns (label, canonical_url, ...) are kept.
+-- Run once in the Supabase SQL editor (after compact_embeddings.sql); called from services/clustering.py.
+create or replace function apply_news_embeddings(updates jsonb)
+returns void
+language sql
+as $$
+    update news n
+    set embedding = coalesce(u.embedding::text::vector, n.embedding),
+        embedding_compact = coalesce(u.embedding_compact, n.embedding_compact)
+    from jsonb_to_recordset(updates) as u(id bigint, embedding jsonb, embedding_compact text)
+    where n.id = u.id;
+$$;
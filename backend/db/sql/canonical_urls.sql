@@ -0,0 +1,7 @@
+-- Canonical article URL (see utils/url_utils.canonicalize_url) used to skip re-ingesting known articles.
+-- A plain unique constraint (NULLs stay distinct) so upserts can use on_conflict=canonical_url.
+-- Fill existing rows afterwards with: python -m db.backfill_canonical_urls
+alter table news add column if not exists canonical_url text;
+drop index if exists news_canonical_url_key;
+alter table news drop constraint if exists news_canonical_url_key;
+alter table news add constraint news_canonical_url_key unique (canonical_url);
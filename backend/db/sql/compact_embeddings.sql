@@ -0,0 +1,4 @@
+-- Optional compact embedding columns (base64 float16/float32, see utils/embedding_codec.py).
+-- Run before apply_issue_updates.sql, then fill them with: python -m db.migrate_embeddings
+alter table news add column if not exists embedding_compact text;
+alter table issues add column if not exists centroid_compact text;
@@ -0,0 +1,6 @@
+-- MinHash signature of the article text (see utils/minhash.py) and the original article
+-- a near-duplicate was republished from. Duplicates reuse the original's label and embedding.
+-- Fill existing rows afterwards with: python -m db.backfill_minhash
+alter table news add column if not exists minhash text;
+alter table news add column if not exists duplicate_of bigint references news (id) on delete set null;
+create index if not exists news_duplicate_of_idx on news (duplicate_of) where duplicate_of is not null;
@@ -0,0 +1,11 @@
+-- One link per (news, issue): lets services/clustering.py insert links with
+-- on_conflict=news_id,issue_id and ignore_duplicates, so a retried or overlapping
+-- clustering run never links an article to the same issue twice.
+-- Run once in the Supabase SQL editor, before apply_issue_updates.sql is used.
+delete from news_issues a
+using news_issues b
+where a.news_id = b.news_id
+  and a.issue_id = b.issue_id
+  and a.ctid > b.ctid;
+alter table news_issues drop constraint if exists news_issues_news_id_issue_id_key;
+alter table news_issues add constraint news_issues_news_id_issue_id_key unique (news_id, issue_id);
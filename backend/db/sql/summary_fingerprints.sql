@@ -0,0 +1,4 @@
+-- Per-label fingerprints of the (news_id, label, content hash) set each stored summary was
+-- generated from (see services/summarization.label_fingerprints). Unchanged label groups
+-- are not sent to the LLM again.
+alter table issues add column if not exists summary_fingerprints jsonb;
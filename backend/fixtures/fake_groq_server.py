@@ -0,0 +1,96 @@
+"""
+Local stand-in for the Groq chat completions API, to exercise the LLM scheduler
+(rate limits, Retry-After, circuit breaker) without a real key.
+
+Usage (from the backend directory):
+    python -m fixtures.fake_groq_server            # listens on 127.0.0.1:8200
+    GROQ_BASE_URL=http://127.0.0.1:8200 GROQ_API_KEY=fake uvicorn main:app
+
+The behaviour can be switched while it runs:
+    curl -X POST 127.0.0.1:8200/_mode -d '{"mode": "rate_limit", "every": 3, "retry_after": 2}'
+Modes: "ok", "rate_limit" (every Nth request gets a 429 with Retry-After), "down" (503).
+Requests with "stream": true are answered word by word as server-sent events.
+"""
+import os
+import json
+import time
+import asyncio
+import uvicorn
+from fastapi import FastAPI, Body
+from fastapi.responses import JSONResponse, StreamingResponse
+
+app = FastAPI(title="Fake Groq")
+
+state = {"mode": "ok", "every": 3, "retry_after": 1, "latency": 0.2, "requests": 0, "in_flight": 0, "max_in_flight": 0}
+
+@app.post("/_mode")
+async def set_mode(config: dict = Body(...)):
+    state.update(config)
+    return state
+
+@app.get("/_stats")
+async def stats():
+    return state
+
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(request: dict = Body(...)):
+    state["requests"] += 1
+    if state["mode"] == "down":
+        return JSONResponse(status_code=503, content={"error": {"message": "Service unavailable"}})
+    if state["mode"] == "rate_limit" and state["requests"] % state["every"] == 0:
+        return JSONResponse(
+            status_code=429,
+            headers={"retry-after": str(state["retry_after"])},
+            content={"error": {"message": "Rate limit reached", "type": "tokens"}},
+        )
+
+    prompt = request["messages"][-1]["content"]
+    content = f"Ringkasan palsu #{state['requests']} ({len(prompt)} karakter)."
+    if request.get("stream"):
+        return StreamingResponse(_stream(request, content), media_type="text/event-stream")
+
+    state["in_flight"] += 1
+    state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+    try:
+        await asyncio.sleep(state["latency"])
+    finally:
+        state["in_flight"] -= 1
+    return {
+        "id": f"fake-{state['requests']}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model"),
+        "choices": [{
+            "index": 0,
+            "finish_reason": "stop",
+            "message": {"role": "assistant", "content": content},
+        }],
+        "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 8, "total_tokens": len(prompt) // 4 + 8},
+    }
+
+async def _stream(request: dict, content: str):
+    state["in_flight"] += 1
+    state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+    try:
+        words = content.split(" ")
+        for i, word in enumerate(words):
+            await asyncio.sleep(state["latency"] / len(words))
+            chunk = {
+                "id": f"fake-{state['requests']}",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.get("model"),
+                "choices": [{
+                    "index": 0,
+                    "delta": {"role": "assistant", "content": word if i == 0 else " " + word},
+                    "finish_reason": "stop" if i == len(words) - 1 else None,
+                    "logprobs": None,
+                }],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+        yield "data: [DONE]\n\n"
+    finally:
+        state["in_flight"] -= 1
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="127.0.0.1", port=int(os.getenv("FAKE_GROQ_PORT", 8200)))
@@ -0,0 +1,65 @@
+"""
+Local feed + article server for exercising the feed poller without hitting news sites.
+
+Usage (from the backend directory):
+    python -m fixtures.feed_server            # listens on 127.0.0.1:8766
+    FEEDS_CONFIG=fixtures/feeds/local_feeds.json FEED_STATE_PATH=/tmp/feed_state.sqlite3 \
+        python -m services.feed_poller --once
+
+/feeds/<name> serves the files in fixtures/feeds with an ETag / Last-Modified and answers
+conditional GETs with 304, so a second --once run reports "not_modified". /art/<n> serves
+the saved article pages of fixtures/pages in turn. Make an article fail with
+    curl -X POST 127.0.0.1:8766/_mode -d '{"fail": [2]}'
+and it stays unseen (retried on the next run) while the others advance the high-water mark.
+"""
+import os
+import hashlib
+import uvicorn
+from email.utils import formatdate
+from fastapi import FastAPI, Body, Request, Response
+from fastapi.responses import HTMLResponse
+
+FIXTURES_DIR = os.path.dirname(__file__)
+FEEDS_DIR = os.path.join(FIXTURES_DIR, "feeds")
+PAGES_DIR = os.path.join(FIXTURES_DIR, "pages")
+PAGES = sorted(name for name in os.listdir(PAGES_DIR) if name.endswith(".html"))
+
+app = FastAPI(title="Fixture feeds")
+
+state = {"fail": [], "feed_requests": 0, "not_modified": 0, "article_requests": 0}
+
+@app.post("/_mode")
+async def set_mode(config: dict = Body(...)):
+    state.update(config)
+    return state
+
+@app.get("/_stats")
+async def stats():
+    return state
+
+@app.get("/feeds/{name}")
+async def feed(name: str, request: Request):
+    state["feed_requests"] += 1
+    path = os.path.join(FEEDS_DIR, os.path.basename(name))
+    if not os.path.isfile(path):
+        return Response(status_code=404)
+    with open(path, "rb") as f:
+        body = f.read()
+    etag = f'"{hashlib.sha1(body).hexdigest()}"'
+    last_modified = formatdate(os.path.getmtime(path), usegmt=True)
+    headers = {"ETag": etag, "Last-Modified": last_modified}
+    if request.headers.get("if-none-match") == etag or request.headers.get("if-modified-since") == last_modified:
+        state["not_modified"] += 1
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/rss+xml", headers=headers)
+
+@app.get("/art/{n}")
+async def article(n: int):
+    state["article_requests"] += 1
+    if n in state["fail"]:
+        return Response(status_code=503)
+    with open(os.path.join(PAGES_DIR, PAGES[(n - 1) % len(PAGES)]), encoding="utf-8") as f:
+        return HTMLResponse(f.read())
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="127.0.0.1", port=int(os.getenv("FIXTURE_FEED_PORT", 8766)))
@@ -0,0 +1,118 @@
+"""
+Shared inference server.
+
+One local process owns the IndoBERT classifier and the sentence-transformer, and every
+uvicorn worker of the API talks to it through services/inference_client.py. Requests
+from all workers are merged into micro-batches before they reach the models.
+
+    python inference_server.py                      # http://127.0.0.1:8100
+    INFERENCE_SERVER_UDS=/tmp/diberita-inference.sock python inference_server.py
+
+Then start the API with the same INFERENCE_SERVER_URL / INFERENCE_SERVER_UDS value.
+"""
+import os
+import asyncio
+import time
+from typing import Callable, List
+from fastapi import FastAPI
+from pydantic import BaseModel
+
+# This process must run the models itself, never forward to another server
+os.environ.pop("INFERENCE_SERVER_URL", None)
+UDS_PATH = os.environ.pop("INFERENCE_SERVER_UDS", None)
+
+from services.model_registry import registry
+from services.classification import classify_contents
+from services.clustering import get_embeddings
+
+MAX_BATCH = int(os.getenv("INFERENCE_MAX_BATCH", 64))
+MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", 10))
+
+class TextsRequest(BaseModel):
+    texts: List[str]
+
+class MicroBatcher:
+    """
+    Collects texts from concurrent requests for up to MAX_WAIT_MS (or MAX_BATCH texts)
+    and runs them through the model in one call on a worker thread.
+    """
+
+    def __init__(self, fn: Callable[[List[str]], list], max_batch: int = MAX_BATCH, max_wait_ms: float = MAX_WAIT_MS):
+        self.fn = fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, texts: List[str]) -> list:
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((texts, future))
+        return await future
+
+    async def run(self):
+        while True:
+            pending = [await self.queue.get()]
+            size = len(pending[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                pending.append(item)
+                size += len(item[0])
+
+            texts = [t for batch_texts, _ in pending for t in batch_texts]
+            try:
+                results = await asyncio.to_thread(self.fn, texts)
+            except Exception as e:
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.items += len(texts)
+            start = 0
+            for batch_texts, future in pending:
+                if not future.done():
+                    future.set_result(results[start:start + len(batch_texts)])
+                start += len(batch_texts)
+
+app = FastAPI(title="Diberita Inference Server")
+classify_batcher = MicroBatcher(classify_contents)
+embed_batcher = MicroBatcher(get_embeddings)
+
+@app.on_event("startup")
+async def start_batchers():
+    asyncio.create_task(classify_batcher.run())
+    asyncio.create_task(embed_batcher.run())
+    registry.start_warm_up()
+
+@app.post("/classify")
+async def classify(data: TextsRequest):
+    return {"labels": await classify_batcher.submit(data.texts)}
+
+@app.post("/embed")
+async def embed(data: TextsRequest):
+    return {"embeddings": await embed_batcher.submit(data.texts)}
+
+@app.get("/health/ready")
+async def ready():
+    return {
+        "models": registry.status(),
+        "classify": {"batches": classify_batcher.batches, "items": classify_batcher.items},
+        "embed": {"batches": embed_batcher.batches, "items": embed_batcher.items},
+    }
+
+if __name__ == "__main__":
+    import uvicorn
+    if UDS_PATH:
+        uvicorn.run(app, uds=UDS_PATH)
+    else:
+        port = int(os.environ.get("INFERENCE_PORT", 8100))
+        uvicorn.run(app, host="127.0.0.1", port=port)
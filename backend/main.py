@@ -1,6 +1,13 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routers import news, users, issues, bookmarks, reading_history
+from routers import news, users, issues, bookmarks, reading_history, health, jobs
+from services.model_registry import registry, MODEL_WARMUP
+from services import inference_client
+from services.http_client import close_client
+from services.feed_poller import FEED_POLLER_ENABLED, get_poller
+from services.summary_queue import summary_queue
+from services.duplicate_index import duplicate_index
+import asyncio
 import os
 # os.environ["HF_HOME"] = "G:/huggingface_cache" # Removed for production
 
@@ -21,6 +28,39 @@ app.include_router(users.router)
 app.include_router(issues.router)
 app.include_router(bookmarks.router)
 app.include_router(reading_history.router)
+app.include_router(health.router)
+app.include_router(jobs.router)
+
+@app.on_event("startup")
+async def warm_up_models():
+    # Load the ML models in the background so startup isn't blocked by them.
+    # Not needed when a shared inference server owns the models.
+    if MODEL_WARMUP and registry.enabled and not inference_client.enabled():
+        registry.start_warm_up()
+
+@app.on_event("startup")
+async def load_duplicate_index():
+    # Up to DUPLICATE_INDEX_MAX_ENTRIES rows from Supabase; off the event loop and the first request
+    duplicate_index.start_loading()
+
+@app.on_event("startup")
+async def start_feed_poller():
+    # Run only on one instance; every poller would ingest the same feeds
+    if FEED_POLLER_ENABLED:
+        app.state.feed_poller_task = asyncio.create_task(get_poller().run_forever())
+
+@app.on_event("startup")
+async def start_summary_queue():
+    # Also resumes unfinished jobs when SUMMARY_QUEUE_DURABLE=1
+    summary_queue.start()
+
+@app.on_event("shutdown")
+async def close_http_client():
+    await close_client()
+
+@app.on_event("shutdown")
+async def stop_summary_queue():
+    await summary_queue.stop()
 
 @app.get("/")
 async def root():
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, HttpUrl
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 from enum import Enum
 
@@ -27,6 +27,9 @@ class NewsCreateAuto(BaseModel):
     link_article: HttpUrl
     source: str # Changed from NewsSource to str for flexibility
 
+class NewsCreateAutoBatch(BaseModel):
+    items: List[NewsCreateAuto]
+
 class NewsInsertManual(BaseModel):
     title: str
     content: str
@@ -59,3 +62,12 @@ class ClusteringRequest(BaseModel):
 
 class ClusteringResponse(BaseModel):
     results: List[dict]
+    # Background summarization job for the touched issues, see GET /jobs/{job_id}
+    job_id: Optional[str] = None
+
+class ClassifyBatchRequest(BaseModel):
+    # Omit (null) to classify every news article that has no label yet; [] classifies nothing
+    news_ids: Optional[List[int]] = None
+
+class ClassifyBatchResponse(BaseModel):
+    results: List[dict]
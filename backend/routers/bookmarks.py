@@ -50,7 +50,7 @@ async def toggle_bookmark(issue_id: int, current_user: dict = Depends(get_curren
         raise HTTPException(status_code=500, detail=str(e))
 
 from dependencies.auth import get_current_user
-from utils.issue_utils import inject_representative_image
+from utils.issue_utils import inject_representative_image, ISSUE_COLUMNS
 from typing import List
 
 @router.get("/")
@@ -59,7 +59,7 @@ async def list_bookmarks(current_user: dict = Depends(get_current_user)):
     try:
         # Join with issues AND their news_issues to get stats
         res = supabase.table("issue_bookmarks") \
-            .select("issue_id, issues(*, news_issues(news(img_url, label)))") \
+            .select(f"issue_id, issues({ISSUE_COLUMNS}, news_issues(news(img_url, label)))") \
             .eq("user_id", current_user["id"]) \
             .execute()
         
@@ -0,0 +1,53 @@
+import asyncio
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from services.model_registry import registry, LOADING, FAILED
+from services import inference_client
+from core.executor import executor_stats
+from services.inference_cache import cache
+from services.http_cache import cache as http_cache
+from services.feed_poller import FEED_POLLER_ENABLED, get_poller
+from services.summary_queue import summary_queue
+from services.llm_scheduler import llm_scheduler
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+@router.get("/live")
+async def liveness():
+    return {"status": "alive"}
+
+@router.get("/ready")
+async def readiness():
+    """
+    Reports the load state of every ML model.
+    Returns 503 while a model is still loading or has failed to load; models that are
+    lazily not loaded yet, or disabled on read-only replicas, don't block readiness.
+    """
+    if inference_client.enabled():
+        # Models live in the shared inference server; probe it off the event loop
+        try:
+            models = (await asyncio.to_thread(inference_client.status))["models"]
+        except Exception as e:
+            return JSONResponse(status_code=503, content={"status": "not_ready", "inference_server": "unreachable", "error": str(e)})
+    else:
+        models = registry.status()
+    ready = all(m["state"] not in (LOADING, FAILED) for m in models.values())
+    body = {
+        "status": "ready" if ready else "not_ready",
+        "ml_enabled": registry.enabled,
+        "inference_server": inference_client.enabled(),
+        "models": models,
+    }
+    return JSONResponse(status_code=200 if ready else 503, content=body)
+
+@router.get("/metrics")
+async def metrics():
+    """Executor queue depth / wait time, cache hit rates, feed poller, summary queue and LLM scheduler counters."""
+    return {
+        "executors": executor_stats(),
+        "inference_cache": cache.stats(),
+        "http_cache": http_cache.stats,
+        "feed_poller": get_poller().stats if FEED_POLLER_ENABLED else None,
+        "summary_queue": summary_queue.stats(),
+        "llm_scheduler": llm_scheduler.snapshot(),
+    }
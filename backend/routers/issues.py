@@ -1,9 +1,12 @@
 from fastapi import APIRouter, HTTPException, Body
+from fastapi.responses import StreamingResponse
 from db.supabase import supabase
 from typing import List, Optional
-from services.summarization import process_issue_summarization
-from utils.issue_utils import inject_representative_image
+from services.summarization import process_issue_summarization, summarize_issue_events
+from services.llm_scheduler import set_priority, ADMIN, LLMUnavailable
+from utils.issue_utils import inject_representative_image, ISSUE_COLUMNS, NEWS_COLUMNS
 import traceback
+import json
 
 router = APIRouter(prefix="/issues", tags=["issues"])
 
@@ -13,7 +16,7 @@ router = APIRouter(prefix="/issues", tags=["issues"])
 async def list_issues():
     try:
         res = supabase.table("issues") \
-            .select("*, news_issues(news(img_url, label))") \
+            .select(f"{ISSUE_COLUMNS}, news_issues(news(img_url, label))") \
             .order("timemodified", desc=True) \
             .execute()
         return inject_representative_image(res.data)
@@ -25,7 +28,7 @@ async def list_issues():
 async def get_hot_issues(limit: int = 5):
     try:
         res = supabase.table("issues") \
-            .select("*, news_issues(news(img_url, label))") \
+            .select(f"{ISSUE_COLUMNS}, news_issues(news(img_url, label))") \
             .order("view_count", desc=True) \
             .limit(limit) \
             .execute()
@@ -38,7 +41,7 @@ async def get_hot_issues(limit: int = 5):
 async def get_latest_issues(limit: int = 10):
     try:
         res = supabase.table("issues") \
-            .select("*, news_issues(news(img_url, label))") \
+            .select(f"{ISSUE_COLUMNS}, news_issues(news(img_url, label))") \
             .order("created_at", desc=True) \
             .limit(limit) \
             .execute()
@@ -52,7 +55,7 @@ async def get_random_issues(limit: int = 5):
     try:
         import random
         res = supabase.table("issues") \
-            .select("*, news_issues(news(img_url, label))") \
+            .select(f"{ISSUE_COLUMNS}, news_issues(news(img_url, label))") \
             .limit(50) \
             .execute()
         
@@ -68,7 +71,7 @@ async def get_random_issues(limit: int = 5):
 @router.get("/{issue_id}")
 async def get_issue(issue_id: int, increment_view: bool = False):
     try:
-        res = supabase.table("issues").select("*").eq("id", issue_id).single().execute()
+        res = supabase.table("issues").select(ISSUE_COLUMNS).eq("id", issue_id).single().execute()
         if not res.data:
             raise HTTPException(status_code=404, detail="Issue not found")
         
@@ -95,7 +98,7 @@ async def get_issue_news(issue_id: int):
     try:
         # Join news_issues with news
         res = supabase.table("news_issues") \
-            .select("news(*)") \
+            .select(f"news({NEWS_COLUMNS})") \
             .eq("issue_id", issue_id) \
             .execute()
         
@@ -116,14 +119,53 @@ async def get_issue_news(issue_id: int):
 async def summarize_issue(issue_id: int):
     """Trigger AI summarization for an issue."""
     try:
+        # Admin-triggered: served before background batch summarization
+        set_priority(ADMIN)
         result = await process_issue_summarization(issue_id)
         if not result:
             raise HTTPException(status_code=404, detail="Issue not found or has no news")
         return {"status": "success", "data": result}
+    except HTTPException:
+        raise
+    except LLMUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Summarization Error: {str(e)}")
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/{issue_id}/summarize/stream")
+async def summarize_issue_stream(issue_id: int):
+    """
+    Streaming variant of /summarize as server-sent events: `summary` (per label),
+    `comparison` and `title` as each finishes, `token` deltas while the LLM writes,
+    then `done` with the saved data, or `error`.
+    The `text` of a finished section is authoritative; a retried call may repeat tokens.
+    """
+    async def stream():
+        # Admin-triggered: served before background batch summarization
+        set_priority(ADMIN)
+        finished = False
+        try:
+            async for event in summarize_issue_events(issue_id, stream_tokens=True):
+                finished = finished or event["event"] == "done"
+                yield _sse(event.pop("event"), event)
+            if not finished:
+                yield _sse("error", {"status": 404, "detail": "Issue not found or has no news"})
+        except LLMUnavailable as e:
+            yield _sse("error", {"status": 503, "detail": str(e)})
+        except Exception as e:
+            traceback.print_exc()
+            yield _sse("error", {"status": 500, "detail": f"Summarization Error: {str(e)}"})
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.put("/{issue_id}")
 async def update_issue(issue_id: int, title: str = Body(..., embed=True)):
     try:
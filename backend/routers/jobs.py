@@ -0,0 +1,16 @@
+from fastapi import APIRouter, HTTPException, Query
+from services.summary_queue import summary_queue
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+@router.get("/")
+async def list_jobs(limit: int = Query(20, ge=1, le=200)):
+    """Most recent background summarization jobs, newest first, plus queue counters."""
+    return {"queue": summary_queue.stats(), "jobs": summary_queue.recent_jobs(limit)}
+
+@router.get("/{job_id}")
+async def get_job(job_id: str):
+    job = summary_queue.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -1,47 +1,119 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Query
+from fastapi.responses import StreamingResponse
 from typing import List, Optional, Union
-from models.news import NewsCreateManual, NewsCreateAuto, NewsInsertManual, NewsUpdate, NewsResponse, ClusteringRequest, ClusteringResponse
+from models.news import NewsCreateManual, NewsCreateAuto, NewsCreateAutoBatch, NewsInsertManual, NewsUpdate, NewsResponse, ClusteringRequest, ClusteringResponse, ClassifyBatchRequest, ClassifyBatchResponse
 from db.supabase import supabase
 from services.scraping import scrape_news
-from services.classification import classify_content
+from services.ingestion import build_news_row, ingest_urls
+from services.url_index import url_index
+from services.duplicate_index import duplicate_index, mark_near_duplicates, originals_of
+from utils.url_utils import canonicalize_url
+from utils.minhash import text_signature
+from services.classification import classify_contents
 from services.clustering import cluster_news_items
 from services.summarization import process_issue_summarization
-from datetime import datetime, timezone
+from services.llm_scheduler import set_priority, ADMIN, LLMUnavailable
+from services.summary_queue import summary_queue
+from utils.issue_utils import NEWS_COLUMNS
+from core.executor import run_inference
 import uuid
+import asyncio
+import json
 import traceback
 
 NEWS_NOT_FOUND = "News article not found"
+NEWS_DUPLICATE = "News article already exists"
+
+def _ensure_not_duplicate(link_article: str):
+    """Raises 409 before any scraping or upload if the canonical URL is already stored."""
+    if not link_article:
+        return
+    existing_id = url_index.lookup(link_article)
+    if existing_id is not None:
+        raise HTTPException(status_code=409, detail={"message": NEWS_DUPLICATE, "news_id": existing_id})
+
+async def _remember_inserted(row: dict):
+    url_index.remember(row.get("canonical_url"), row["id"])
+    # May still be loading the duplicate index from Supabase; keep that off the event loop
+    duplicate_of = (await asyncio.to_thread(mark_near_duplicates, [row])).get(row["id"])
+    if duplicate_of:
+        row["duplicate_of"] = duplicate_of
+
+async def _classify_items(news_items: List[dict]) -> List[str]:
+    """
+    Labels `{id, content, duplicate_of}` rows. Near-duplicates take over the label of
+    their original when it has one; only the rest go through IndoBERT.
+    """
+    originals = originals_of(news_items, "label")
+    labels = [(originals.get(item.get("duplicate_of")) or {}).get("label") for item in news_items]
+    to_classify = [i for i, label in enumerate(labels) if not label]
+    if to_classify:
+        predicted = await run_inference(classify_contents, [news_items[i]["content"] for i in to_classify])
+        for i, label in zip(to_classify, predicted):
+            labels[i] = label
+    return labels
 
 router = APIRouter(prefix="/news", tags=["news"])
 
 @router.post("/bulk-cluster", response_model=ClusteringResponse)
 async def bulk_cluster(data: ClusteringRequest):
     try:
-        results = cluster_news_items(data.news_ids)
+        # Supabase reads/writes run on a plain thread; only the encode step takes an inference slot
+        results = await asyncio.to_thread(cluster_news_items, data.news_ids)
         
-        # Identify which issues were touched and trigger summarization for them
-        issue_ids = set()
-        for r in results:
-            issue_ids.add(r["issue_id"])
-            
-        for issue_id in issue_ids:
-            try:
-                await process_issue_summarization(issue_id)
-            except Exception as e:
-                print(f"Auto-Summarization Error for Issue {issue_id}: {str(e)}")
-                
-        return {"results": results}
+        # Summarize the touched issues in the background; the job id can be polled on /jobs
+        issue_ids = sorted({r["issue_id"] for r in results})
+        job = summary_queue.submit(issue_ids)
+        
+        return {"results": results, "job_id": job["id"]}
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Clustering Error: {str(e)}")
 
+@router.post("/classify-batch", response_model=ClassifyBatchResponse)
+async def classify_news_batch(data: ClassifyBatchRequest):
+    try:
+        # 1. Get news contents (explicit ids or every unlabelled article)
+        if data.news_ids is not None and not data.news_ids:
+            return {"results": []}
+        query = supabase.table("news").select("id, content, duplicate_of")
+        if data.news_ids is not None:
+            query = query.in_("id", data.news_ids)
+        else:
+            query = query.is_("label", "null")
+        news_items = query.execute().data
+
+        if not news_items:
+            return {"results": []}
+
+        # 2. Run IndoBERT classification in length-sorted micro-batches (near-duplicates reuse their original's label)
+        labels = await _classify_items(news_items)
+
+        # 3. Write labels back, one update per label instead of one per article
+        ids_by_label = {}
+        for item, label in zip(news_items, labels):
+            ids_by_label.setdefault(label, []).append(item["id"])
+        for label, ids in ids_by_label.items():
+            supabase.table("news").update({"label": label}).in_("id", ids).execute()
+
+        return {"results": [{"news_id": item["id"], "label": label} for item, label in zip(news_items, labels)]}
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=f"Classification Error: {str(e)}")
+
 @router.post("/issues/{issue_id}/summarize")
 async def summarize_issue(issue_id: int):
     try:
+        # Admin-triggered: served before background batch summarization
+        set_priority(ADMIN)
         result = await process_issue_summarization(issue_id)
         if not result:
             raise HTTPException(status_code=404, detail="Issue not found or has no news")
         return {"status": "success", "data": result}
+    except HTTPException:
+        raise
+    except LLMUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Summarization Error: {str(e)}")
@@ -56,6 +128,7 @@ async def create_news_manual(
     image: UploadFile = File(...)
 ):
     try:
+        _ensure_not_duplicate(link_article)
         # 1. Upload image to Supabase Storage
         file_ext = image.filename.split(".")[-1]
         file_path = f"news/{uuid.uuid4()}.{file_ext}"
@@ -74,11 +147,16 @@ async def create_news_manual(
             "source": source,
             "img_url": img_url,
             "published_at": published_at,
-            "label": None
+            "label": None,
+            "canonical_url": canonicalize_url(link_article) or None,
+            "minhash": text_signature(content)
         }
         
         res = supabase.table("news").insert(news_data).execute()
+        await _remember_inserted(res.data[0])
         return res.data[0]
+    except HTTPException:
+        raise
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Manual Error: {str(e)}")
@@ -86,26 +164,40 @@ async def create_news_manual(
 @router.post("/auto", response_model=NewsResponse)
 async def create_news_auto(data: NewsCreateAuto):
     try:
+        _ensure_not_duplicate(str(data.link_article))
         # 1. Scrape metadata
-        scraped_data = scrape_news(str(data.link_article))
+        scraped_data = await scrape_news(str(data.link_article))
         
         # 2. Save to database
-        news_data = {
-            "link_article": str(data.link_article),
-            "source": data.source,
-            "title": scraped_data["title"],
-            "content": scraped_data["content"],
-            "img_url": scraped_data["img_url"],
-            "published_at": scraped_data["published_at"] if scraped_data["published_at"] else datetime.now(timezone.utc).isoformat(),
-            "label": None
-        }
+        news_data = build_news_row(str(data.link_article), data.source, scraped_data)
         
         res = supabase.table("news").insert(news_data).execute()
+        await _remember_inserted(res.data[0])
         return res.data[0]
+    except HTTPException:
+        raise
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Auto Error: {str(e)}")
 
+@router.post("/auto-batch")
+async def create_news_auto_batch(data: NewsCreateAutoBatch):
+    """
+    Scrapes a list of URLs concurrently and inserts them in bulk.
+    Streams one NDJSON line per URL (ok / duplicate / failed) and a final summary line.
+    """
+    items = [{"link_article": str(i.link_article), "source": i.source} for i in data.items]
+
+    async def stream():
+        try:
+            async for result in ingest_urls(items):
+                yield json.dumps(result) + "\n"
+        except Exception as e:
+            traceback.print_exc()
+            yield json.dumps({"status": "error", "error": str(e)}) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
 @router.get("/", response_model=List[NewsResponse])
 async def list_news(
     source: Optional[str] = None,
@@ -114,7 +206,7 @@ async def list_news(
     clustered: Optional[bool] = None
 ):
     # Fetch news with linked issues titles
-    query = supabase.table("news").select("*, issues:news_issues(issue:issues(title))")
+    query = supabase.table("news").select(f"{NEWS_COLUMNS}, issues:news_issues(issue:issues(title))")
     
     if source:
         query = query.eq("source", source)
@@ -140,7 +232,7 @@ async def list_news(
 
 @router.get("/{news_id}", response_model=NewsResponse)
 async def get_news(news_id: Union[str, int]):
-    res = supabase.table("news").select("*").eq("id", news_id).single().execute()
+    res = supabase.table("news").select(NEWS_COLUMNS).eq("id", news_id).single().execute()
     if not res.data:
         raise HTTPException(status_code=404, detail=NEWS_NOT_FOUND)
     return res.data
@@ -163,14 +255,12 @@ async def update_news(news_id: Union[str, int], data: NewsUpdate):
 @router.post("/{news_id}/classify", response_model=NewsResponse)
 async def classify_news(news_id: Union[str, int]):
     # 1. Get news content
-    res = supabase.table("news").select("content").eq("id", news_id).single().execute()
+    res = supabase.table("news").select("id, content, duplicate_of").eq("id", news_id).single().execute()
     if not res.data:
         raise HTTPException(status_code=404, detail="News article not found")
     
-    content = res.data["content"]
-    
-    # 2. Run IndoBERT classification
-    label = classify_content(content)
+    # 2. Run IndoBERT classification (or reuse the label of the original article)
+    label = (await _classify_items([res.data]))[0]
     
     # 3. Update label and is_classified in database
     update_res = supabase.table("news").update({
@@ -181,6 +271,7 @@ async def classify_news(news_id: Union[str, int]):
 @router.post("/manual-insert", response_model=NewsResponse)
 async def create_news_manual_json(data: NewsInsertManual):
     try:
+        _ensure_not_duplicate(data.url)
         news_data = {
             "title": data.title,
             "content": data.content,
@@ -188,10 +279,15 @@ async def create_news_manual_json(data: NewsInsertManual):
             "link_article": data.url if data.url else "",
             "img_url": data.img_url if data.img_url else "https://via.placeholder.com/400x200",
             "published_at": data.published_at.isoformat(),
-            "label": None
+            "label": None,
+            "canonical_url": canonicalize_url(data.url) or None,
+            "minhash": text_signature(data.content)
         }
         res = supabase.table("news").insert(news_data).execute()
+        await _remember_inserted(res.data[0])
         return res.data[0]
+    except HTTPException:
+        raise
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Manual Insert Error: {str(e)}")
@@ -200,6 +296,8 @@ async def create_news_manual_json(data: NewsInsertManual):
 async def delete_news(news_id: Union[str, int]):
     try:
         supabase.table("news").delete().eq("id", news_id).execute()
+        url_index.forget(news_id)
+        duplicate_index.forget(news_id)
         return {"status": "success", "message": "News article deleted"}
     except Exception as e:
         traceback.print_exc()
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException, Depends, status
 from db.supabase import supabase
 from dependencies.auth import get_current_user
+from utils.issue_utils import NEWS_COLUMNS
 
 router = APIRouter(prefix="/reading-history", tags=["reading-history"])
 
@@ -24,7 +25,7 @@ async def get_reading_history(current_user: dict = Depends(get_current_user)):
     """Get reading history for the current user."""
     try:
         res = supabase.table("reading_history") \
-            .select("news_id, read_at, news(*)") \
+            .select(f"news_id, read_at, news({NEWS_COLUMNS})") \
             .eq("user_id", current_user["id"]) \
             .order("read_at", desc=True) \
             .execute()
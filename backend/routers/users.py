@@ -4,6 +4,7 @@ from typing import Optional
 from db.supabase import supabase
 from core.security import get_password_hash, verify_password, create_access_token
 from dependencies.auth import get_current_user, get_current_admin
+from core.executor import run_crypto
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -36,7 +37,7 @@ async def register(user_data: UserRegister):
     # Default role is 'user'
     new_user = {
         "email": user_data.email,
-        "password": get_password_hash(user_data.password),
+        "password": await run_crypto(get_password_hash, user_data.password),
         "full_name": user_data.full_name,
         "role": "user"
     }
@@ -50,7 +51,7 @@ async def login(credentials: UserLogin):
     res = supabase.table("users").select("*").eq("email", credentials.email).execute()
     user = res.data[0] if res.data else None
     
-    if not user or not verify_password(credentials.password, user["password"]):
+    if not user or not await run_crypto(verify_password, credentials.password, user["password"]):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect email or password")
         
     access_token = create_access_token(data={"sub": user["email"]})
@@ -72,7 +73,7 @@ async def register_admin(user_data: UserRegister, current_admin: dict = Depends(
         
     new_admin = {
         "email": user_data.email,
-        "password": get_password_hash(user_data.password),
+        "password": await run_crypto(get_password_hash, user_data.password),
         "full_name": user_data.full_name,
         "role": "admin"
     }
@@ -93,7 +94,7 @@ async def update_profile(data: UserUpdate, current_user: dict = Depends(get_curr
                 raise HTTPException(status_code=400, detail="Email already taken")
             update_data["email"] = data.email
     if data.password:
-        update_data["password"] = get_password_hash(data.password)
+        update_data["password"] = await run_crypto(get_password_hash, data.password)
         
     if not update_data:
         return {"message": "No changes made"}
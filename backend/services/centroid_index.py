@@ -0,0 +1,136 @@
+import json
+import numpy as np
+from typing import List, Optional, Tuple, Union
+from utils.embedding_codec import is_compact, decode_embedding
+
+Vector = Union[List[float], np.ndarray]
+
+def to_vector(value) -> Optional[np.ndarray]:
+    """Converts a stored embedding (compact string, JSON string, list or array) into a float32 vector."""
+    if value is None:
+        return None
+    if is_compact(value):
+        try:
+            return decode_embedding(value)
+        except ValueError:
+            return None
+    if isinstance(value, str):
+        if not value:
+            return None
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return None
+    try:
+        vector = np.asarray(value, dtype=np.float32)
+    except (TypeError, ValueError):
+        return None
+    if vector.ndim != 1 or vector.size == 0:
+        return None
+    return vector
+
+def issue_centroid(issue: dict):
+    """Returns the stored centroid of an issue row, preferring the compact column."""
+    return issue.get("centroid_compact") or issue.get("centroid_embedding")
+
+def news_embedding(item: dict):
+    """Returns the stored embedding of a news row, preferring the compact column."""
+    return item.get("embedding_compact") or item.get("embedding")
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+class CentroidIndex:
+    """
+    In-memory index of issue centroids.
+    Keeps every centroid as one row of a pre-normalised float32 matrix so that
+    best-match lookups are a single matrix multiply instead of a Python loop.
+    """
+
+    def __init__(self, dim: Optional[int] = None, capacity: int = 64):
+        self.dim = dim
+        self._capacity = capacity
+        self._size = 0
+        self._matrix = np.zeros((capacity, dim), dtype=np.float32) if dim else None
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._positions = {}
+
+    @classmethod
+    def from_issues(cls, issues: List[dict]) -> "CentroidIndex":
+        """Builds an index from rows of the `issues` table, skipping invalid centroids."""
+        index = cls(capacity=max(len(issues), 64))
+        for issue in issues:
+            vector = to_vector(issue_centroid(issue))
+            if vector is None:
+                continue
+            if index.dim is not None and vector.shape[0] != index.dim:
+                continue
+            index.upsert(issue["id"], vector)
+        return index
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, issue_id) -> bool:
+        return issue_id in self._positions
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._ids[:self._size]
+
+    @property
+    def matrix(self) -> np.ndarray:
+        if self._matrix is None:
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        return self._matrix[:self._size]
+
+    def _grow(self):
+        self._capacity *= 2
+        matrix = np.zeros((self._capacity, self.dim), dtype=np.float32)
+        matrix[:self._size] = self._matrix[:self._size]
+        self._matrix = matrix
+        ids = np.zeros(self._capacity, dtype=np.int64)
+        ids[:self._size] = self._ids[:self._size]
+        self._ids = ids
+
+    def upsert(self, issue_id: int, centroid: Vector):
+        """Adds a new issue centroid or replaces an existing one in place."""
+        vector = np.asarray(centroid, dtype=np.float32)
+        if self.dim is None:
+            self.dim = vector.shape[0]
+            self._matrix = np.zeros((self._capacity, self.dim), dtype=np.float32)
+        if vector.shape[0] != self.dim:
+            raise ValueError(f"Dimension mismatch: index {self.dim} vs centroid {vector.shape[0]}")
+
+        position = self._positions.get(issue_id)
+        if position is None:
+            if self._size == self._capacity:
+                self._grow()
+            position = self._size
+            self._positions[issue_id] = position
+            self._ids[position] = issue_id
+            self._size += 1
+        self._matrix[position] = _normalize(vector)
+
+    def best_match(self, embedding: Vector) -> Tuple[Optional[int], float]:
+        """Returns (issue_id, cosine similarity) of the closest centroid, or (None, -1.0)."""
+        ids, sims = self.best_matches(np.asarray(embedding, dtype=np.float32)[None, :])
+        if ids[0] < 0:
+            return None, -1.0
+        return int(ids[0]), float(sims[0])
+
+    def best_matches(self, embeddings: Vector) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Batch version of best_match for an (n, dim) matrix of embeddings.
+        Rows without a match get issue id -1 and similarity -1.0.
+        """
+        queries = np.asarray(embeddings, dtype=np.float32)
+        n = queries.shape[0]
+        if self._size == 0 or queries.shape[1] != self.dim:
+            return np.full(n, -1, dtype=np.int64), np.full(n, -1.0, dtype=np.float32)
+
+        sims = _normalize(queries) @ self.matrix.T
+        best = np.argmax(sims, axis=1)
+        return self.ids[best], sims[np.arange(n), best]
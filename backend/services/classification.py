@@ -1,18 +1,28 @@
+import os
 import torch
 import re
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
+from typing import List
+from services.model_registry import registry
+from services.model_backends import load_classifier, INFERENCE_BACKEND
+from services.inference_cache import cached_batch
+from services import inference_client
 
 repo_id = "Ricky131/indobert-bias-news-augmented"
 
-# Load model and tokenizer once
-tokenizer = AutoTokenizer.from_pretrained(repo_id)
-model = AutoModelForSequenceClassification.from_pretrained(repo_id)
-model.eval()
+# Loaded on first use (or by the startup warm-up), not at import time.
+# The backend (torch / int8 / onnx) is chosen with INFERENCE_BACKEND.
+registry.register("classifier", lambda: load_classifier(repo_id))
 
 # Label mapping
 label_mapping = {'netral': 0, 'oposisi': 1, 'pro_pemerintah': 2}
 id2label = {v: k for k, v in label_mapping.items()}
 
+# Cache entries are only valid for the model (and backend) that produced them
+CACHE_MODEL_ID = f"{repo_id}@{INFERENCE_BACKEND}"
+
+MAX_LENGTH = 256
+BATCH_SIZE = int(os.getenv("CLASSIFY_BATCH_SIZE", 16))
+
 def clean_text(text: str) -> str:
     text = text.lower()
     text = re.sub(r"http\S+", "", text)
@@ -20,16 +30,47 @@ def clean_text(text: str) -> str:
     text = re.sub(r"\s+", " ", text).strip()
     return text
 
+def _classify_texts(texts: List[str], batch_size: int) -> List[str]:
+    tokenizer, model = registry.get("classifier")
+    encodings = tokenizer(texts, truncation=True, max_length=MAX_LENGTH)
+    input_ids = encodings["input_ids"]
+    order = sorted(range(len(texts)), key=lambda i: len(input_ids[i]))
+
+    labels = [None] * len(texts)
+    with torch.inference_mode():
+        for start in range(0, len(order), batch_size):
+            chunk = order[start:start + batch_size]
+            features = [{k: encodings[k][i] for k in encodings.keys()} for i in chunk]
+            inputs = tokenizer.pad(features, padding=True, return_tensors="pt")
+            logits = model(**inputs).logits
+            predicted_ids = torch.argmax(logits, dim=1).tolist()
+            for i, predicted_id in zip(chunk, predicted_ids):
+                labels[i] = id2label[predicted_id]
+    return labels
+
+def classify_contents(contents: List[str], batch_size: int = BATCH_SIZE) -> List[str]:
+    """
+    Classifies many news contents at once, returning labels in input order.
+    Texts are sorted by token length and padded per micro-batch, so short
+    articles are not padded up to the longest one in the whole set.
+    Labels of previously seen texts come from the inference cache.
+    """
+    if not contents:
+        return []
+
+    texts = [clean_text(c or "") for c in contents]
+
+    def compute(indexes: List[int]) -> List[str]:
+        subset = [texts[i] for i in indexes]
+        if inference_client.enabled():
+            return inference_client.classify(subset)
+        return _classify_texts(subset, batch_size)
+
+    return cached_batch("label", CACHE_MODEL_ID, texts, compute, str.encode, bytes.decode)
+
 def classify_content(content: str) -> str:
     """
     Classifies news content into 'netral', 'oposisi', or 'pro_pemerintah'.
     Uses max_length=256 as specified in user's colab.
     """
-    text = clean_text(content)
-    inputs = tokenizer(text, return_tensors="pt", padding=True, truncation=True, max_length=256)
-    
-    with torch.no_grad():
-        logits = model(**inputs).logits
-        predicted_id = torch.argmax(logits, dim=1).item()
-    
-    return id2label[predicted_id]
+    return classify_contents([content])[0]
@@ -1,18 +1,65 @@
-from sentence_transformers import SentenceTransformer
+import os
 import numpy as np
 from db.supabase import supabase
-from typing import List, Optional
+from typing import List, Optional, Dict
+from services.model_registry import registry
+from services.model_backends import load_embedder, INFERENCE_BACKEND
+from services.inference_cache import cached_batch
+from services.classification import clean_text
+from services import inference_client
+from services.duplicate_index import originals_of
+from services.centroid_index import CentroidIndex, to_vector, issue_centroid, news_embedding
+from utils.embedding_codec import compact_enabled, encode_embedding
+from core.executor import call_inference
 import torch
 
-# Load model once at module level
-model = SentenceTransformer("sentence-transformers/paraphrase-multilingual-mpnet-base-v2")
+EMBEDDING_MODEL_ID = "sentence-transformers/paraphrase-multilingual-mpnet-base-v2"
+
+# Loaded on first use (or by the startup warm-up), not at import time.
+# The backend (torch / int8 / onnx) is chosen with INFERENCE_BACKEND.
+registry.register("embedder", lambda: load_embedder(EMBEDDING_MODEL_ID))
+
+# Cache entries are only valid for the model (and backend) that produced them
+CACHE_MODEL_ID = f"{EMBEDDING_MODEL_ID}@{INFERENCE_BACKEND}"
 
 SIMILARITY_THRESHOLD = 0.65
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 32))
+# Only the columns clustering needs. With compact embeddings the JSON centroid is only read
+# for issues that have no centroid_compact yet (not migrated by db/migrate_embeddings.py).
+ISSUE_MATCH_COLUMNS = "id, title, news_count, centroid_compact" if compact_enabled() else "id, title, news_count, centroid_embedding"
+ISSUE_FALLBACK_COLUMNS = "id, title, news_count, centroid_embedding"
+NEWS_EMBEDDING_COLUMNS = "embedding_compact" if compact_enabled() else "embedding"
+# PostgREST caps every response (1000 rows by default), so issues are read in pages
+ISSUE_PAGE_SIZE = 1000
 
 def get_embedding(text: str) -> List[float]:
     """Generates embedding for a given text."""
-    embedding = model.encode(text)
-    return embedding.tolist()
+    return get_embeddings([text])[0]
+
+def get_embeddings(texts: List[str], batch_size: int = EMBEDDING_BATCH_SIZE) -> List[List[float]]:
+    """
+    Generates embeddings for many texts with a single batched encode call.
+    Embeddings of previously seen texts come from the inference cache.
+    """
+    if not texts:
+        return []
+
+    def compute(indexes: List[int]) -> List[List[float]]:
+        subset = [texts[i] for i in indexes]
+        if inference_client.enabled():
+            return inference_client.embed(subset)
+        # Only the encode itself occupies the (small) inference pool, not the caller's DB I/O
+        return call_inference(lambda: registry.get("embedder").encode(subset, batch_size=batch_size).tolist())
+
+    keys = [clean_text(t) for t in texts]
+    return cached_batch(
+        "embedding", CACHE_MODEL_ID, keys, compute,
+        lambda v: np.asarray(v, dtype=np.float32).tobytes(),
+        lambda b: np.frombuffer(b, dtype=np.float32).tolist(),
+    )
+
+def _embedding_text(item: dict) -> str:
+    return f"{item['title']} {item['content'][:450]}"
 
 def generate_issue_title(news_title: str, news_content: str) -> str:
     """Generate a generic issue title from news content."""
@@ -37,144 +84,241 @@ def cosine_similarity(v1: List[float], v2: List[float]) -> float:
     n2 = np.array(v2, dtype=np.float32)
     return float(np.dot(n1, n2) / (np.linalg.norm(n1) * np.linalg.norm(n2)))
 
-def _get_best_matching_issue(embedding: List[float], existing_issues: List[dict]):
-    best_match = None
-    max_sim = -1.0
-    for issue in existing_issues:
-        centroid = issue.get("centroid_embedding")
-        if not centroid:
-            continue
-            
-        # Convert centroid to list if it's a string
-        if isinstance(centroid, str):
-            import json
-            try:
-                centroid = json.loads(centroid)
-            except:
-                continue
-        
-        # Ensure it's a list (some DB configs return it differently)
-        if not isinstance(centroid, list):
-            continue
-            
-        # Dimension check
-        if len(centroid) != len(embedding):
-            # Try to log mismatch once to avoid spam but help debugging
-            # print(f"⚠️ Dimension mismatch: issue {len(centroid)} vs news {len(embedding)}")
-            continue
-            
-        try:
-            sim = cosine_similarity(embedding, centroid)
-            if sim > max_sim:
-                max_sim = sim
-                best_match = issue
-        except Exception as e:
-            print(f"⚠️ Error calculating similarity for issue {issue.get('id')}: {e}")
-            continue
-            
-    return best_match, max_sim
-
-def _process_single_item(item: dict, existing_issues: List[dict]):
-    # Get or generate embedding
-    embedding = item.get("embedding")
+def _ensure_embeddings(news_items: List[dict]):
+    """
+    Makes sure every news item carries a parsed embedding.
+    Near-duplicates copy the embedding of their original; the remaining missing or
+    unparseable embeddings are generated in one batched encode call. Both are written
+    back in one request (embedding columns only) before any matching starts.
+    """
+    missing = []
+    for item in news_items:
+        embedding = to_vector(news_embedding(item))
+        if embedding is None:
+            if news_embedding(item):
+                print(f"⚠️ Failed to parse cached embedding for news {item['id']}, regenerating...")
+            missing.append(item)
+        else:
+            item["embedding"] = embedding
     
-    # Handle string format from database
-    if isinstance(embedding, str) and embedding:
-        import json
-        try:
-            embedding = json.loads(embedding)
-        except Exception as e:
-            print(f"⚠️ Failed to parse cached embedding for news {item['id']}, regenerating...")
-            embedding = None
-            
-    if not embedding:
-        text_to_embed = f"{item['title']} {item['content'][:450]}"
-        embedding = get_embedding(text_to_embed)
-        supabase.table("news").update({"embedding": embedding}).eq("id", item["id"]).execute()
+    if not missing:
+        return
+    
+    originals = originals_of(missing, NEWS_EMBEDDING_COLUMNS)
+    to_encode = []
+    for item in missing:
+        original = originals.get(item.get("duplicate_of"))
+        embedding = to_vector(news_embedding(original)) if original else None
+        if embedding is None:
+            to_encode.append(item)
+        else:
+            item["embedding"] = embedding
+            if compact_enabled():
+                item["embedding_compact"] = encode_embedding(embedding)
     
-    # After potential re-generation or parsing, ensure it's a list
-    if not isinstance(embedding, list):
+    if to_encode:
+        print(f"🧮 Generating {len(to_encode)} embeddings in one batch ({len(missing) - len(to_encode)} reused from originals)")
+        embeddings = get_embeddings([_embedding_text(item) for item in to_encode])
+        for item, embedding in zip(to_encode, embeddings):
+            item["embedding"] = np.asarray(embedding, dtype=np.float32)
+            if compact_enabled():
+                item["embedding_compact"] = encode_embedding(embedding)
+    
+    _write_embeddings(missing)
+
+def _write_embeddings(items: List[dict]):
+    """Stores only the embedding columns of the given news rows, so other columns edited meanwhile are kept."""
+    updates = [
+        {
+            "id": item["id"],
+            "embedding": item["embedding"].tolist(),
+            "embedding_compact": item.get("embedding_compact") if compact_enabled() else None,
+        }
+        for item in items
+    ]
+    try:
+        # One round trip, see db/sql/apply_news_embeddings.sql
+        supabase.rpc("apply_news_embeddings", {"updates": updates}).execute()
+    except Exception as e:
+        print(f"⚠️ apply_news_embeddings RPC failed ({e}), falling back to per-news updates")
+        for update in updates:
+            data = {"embedding": update["embedding"]}
+            if update["embedding_compact"] is not None:
+                data["embedding_compact"] = update["embedding_compact"]
+            supabase.table("news").update(data).eq("id", update["id"]).execute()
+
+def _process_single_item(item: dict, index: CentroidIndex, issues_by_id: Dict[int, dict], writes: "IssueWriteBuffer"):
+    embedding = item.get("embedding")
+    if not isinstance(embedding, np.ndarray):
         print(f"⚠️ Invalid embedding for news {item['id']}")
         return None
         
-    best_match, max_sim = _get_best_matching_issue(embedding, existing_issues)
+    best_id, max_sim = index.best_match(embedding)
+    best_match = issues_by_id.get(best_id)
     
     print(f"🔍 News '{item['title'][:50]}...'")
     print(f"   Best match: Issue #{best_match['id'] if best_match else 'None'} - Similarity: {max_sim:.2%}")
     
     if max_sim >= SIMILARITY_THRESHOLD and best_match:
         print(f"   ✅ Matched to existing issue: '{best_match['title'][:50]}...'")
-        link_news_to_issue(item["id"], best_match["id"], float(max_sim))
-        # Update centroid agar isu tetap relevan dengan berita-berita terbaru yang masuk
-        update_issue_centroid(best_match, embedding)
+        if writes.add_link(item["id"], best_match["id"], float(max_sim)):
+            # Update centroid agar isu tetap relevan dengan berita-berita terbaru yang masuk
+            updated_centroid = update_issue_centroid(best_match, embedding)
+            if updated_centroid is not None:
+                index.upsert(best_match["id"], updated_centroid)
+                writes.set_centroid(best_match["id"], updated_centroid)
         return {"news_id": item["id"], "issue_id": best_match["id"], "mode": "matched", "similarity": max_sim}
     else:
         print(f"   🆕 Creating new issue (similarity {max_sim:.2%} < threshold {SIMILARITY_THRESHOLD:.2%})")
         # Create new issue with generic title
         issue_title = generate_issue_title(item["title"], item.get("content", ""))
-        new_issue = supabase.table("issues").insert({
+        issue_row = {
             "title": issue_title,
-            "centroid_embedding": embedding,
+            "centroid_embedding": embedding.tolist(),
             "news_count": 1
-        }).execute()
+        }
+        if compact_enabled():
+            issue_row["centroid_compact"] = encode_embedding(embedding)
+        new_issue = supabase.table("issues").insert(issue_row).execute()
         
         if new_issue.data:
             issue_id = new_issue.data[0]["id"]
-            link_news_to_issue(item["id"], issue_id, 1.0, update_count=False) # Already set to 1
-            existing_issues.append(new_issue.data[0])
+            writes.add_link(item["id"], issue_id, 1.0, count=False) # Already set to 1
+            issues_by_id[issue_id] = new_issue.data[0]
+            index.upsert(issue_id, embedding)
             return {"news_id": item["id"], "issue_id": issue_id, "mode": "created", "similarity": 1.0}
     return None
 
+class IssueWriteBuffer:
+    """
+    Collects the news_issues links, news_count deltas and shifted centroids of one
+    clustering run so they can be flushed with a couple of bulk requests at the end.
+    """
+
+    def __init__(self, existing_links: List[dict]):
+        self.known_links = {(l["news_id"], l["issue_id"]) for l in existing_links}
+        self.links = []
+        self.counted = set()
+        self.centroids = {}
+
+    def add_link(self, news_id: int, issue_id: int, similarity: float, count: bool = True) -> bool:
+        """Queues a link; returns False if the news is already linked to that issue."""
+        key = (news_id, issue_id)
+        if key in self.known_links:
+            return False
+        self.known_links.add(key)
+        self.links.append({"news_id": news_id, "issue_id": issue_id, "similarity": similarity})
+        if count:
+            self.counted.add(key)
+        return True
+
+    def set_centroid(self, issue_id: int, centroid: np.ndarray):
+        self.centroids[issue_id] = centroid.tolist()
+
+    def flush(self):
+        inserted = []
+        if self.links:
+            # ON CONFLICT DO NOTHING only returns the rows that were really inserted,
+            # so links added by a concurrent run are not counted twice (needs db/sql/news_issues_unique.sql)
+            res = supabase.table("news_issues") \
+                .upsert(self.links, on_conflict="news_id,issue_id", ignore_duplicates=True) \
+                .execute()
+            inserted = res.data or []
+        
+        deltas = {}
+        for link in inserted:
+            if (link["news_id"], link["issue_id"]) in self.counted:
+                deltas[link["issue_id"]] = deltas.get(link["issue_id"], 0) + 1
+        
+        updates = []
+        for issue_id in set(deltas) | set(self.centroids):
+            centroid = self.centroids.get(issue_id)
+            updates.append({
+                "id": issue_id,
+                "news_count_delta": deltas.get(issue_id, 0),
+                "centroid_embedding": centroid,
+                "centroid_compact": encode_embedding(centroid) if centroid is not None and compact_enabled() else None,
+            })
+        if not updates:
+            return
+        
+        try:
+            # Atomic server-side increment, see db/sql/apply_issue_updates.sql
+            supabase.rpc("apply_issue_updates", {"updates": updates}).execute()
+        except Exception as e:
+            print(f"⚠️ apply_issue_updates RPC failed ({e}), falling back to per-issue updates")
+            for update in updates:
+                res = supabase.table("issues").select("news_count").eq("id", update["id"]).single().execute()
+                data = {"timemodified": "now()"}
+                if res.data and update["news_count_delta"]:
+                    data["news_count"] = (res.data.get("news_count") or 0) + update["news_count_delta"]
+                if update["centroid_embedding"] is not None:
+                    data["centroid_embedding"] = update["centroid_embedding"]
+                if update["centroid_compact"] is not None:
+                    data["centroid_compact"] = update["centroid_compact"]
+                supabase.table("issues").update(data).eq("id", update["id"]).execute()
+
+def _select_pages(build_query) -> List[dict]:
+    """Runs `build_query()` page by page (ordered by id) until a short page comes back."""
+    rows, start = [], 0
+    while True:
+        page = build_query().order("id").range(start, start + ISSUE_PAGE_SIZE - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < ISSUE_PAGE_SIZE:
+            return rows
+        start += len(page)
+
+def _load_issues() -> List[dict]:
+    if not compact_enabled():
+        return _select_pages(lambda: supabase.table("issues").select(ISSUE_MATCH_COLUMNS))
+    issues = _select_pages(
+        lambda: supabase.table("issues").select(ISSUE_MATCH_COLUMNS).not_.is_("centroid_compact", "null")
+    )
+    # Issues without a compact centroid yet fall back to the JSON column
+    issues += _select_pages(
+        lambda: supabase.table("issues").select(ISSUE_FALLBACK_COLUMNS).is_("centroid_compact", "null")
+    )
+    return issues
+
 def cluster_news_items(news_ids: List[int]):
     news_res = supabase.table("news").select("*").in_("id", news_ids).execute()
     news_items = news_res.data
-    issues_res = supabase.table("issues").select("*").execute()
-    existing_issues = issues_res.data
+    existing_issues = _load_issues()
+    links_res = supabase.table("news_issues").select("news_id, issue_id").in_("news_id", news_ids).execute()
+    
+    index = CentroidIndex.from_issues(existing_issues)
+    issues_by_id = {issue["id"]: issue for issue in existing_issues}
+    writes = IssueWriteBuffer(links_res.data or [])
+    
+    _ensure_embeddings(news_items)
     
     results = []
     for item in news_items:
-        res = _process_single_item(item, existing_issues)
+        res = _process_single_item(item, index, issues_by_id, writes)
         if res:
             results.append(res)
+    
+    writes.flush()
     return results
 
-def link_news_to_issue(news_id: int, issue_id: int, similarity: float, update_count: bool = True):
-    exists = supabase.table("news_issues").select("*").eq("news_id", news_id).eq("issue_id", issue_id).execute()
-    if not exists.data:
-        supabase.table("news_issues").insert({
-            "news_id": news_id,
-            "issue_id": issue_id,
-            "similarity": similarity
-        }).execute()
-        
-        if update_count:
-            # Manual update instead of RPC for better portability
-            res = supabase.table("issues").select("news_count").eq("id", issue_id).single().execute()
-            if res.data:
-                count = (res.data.get("news_count") or 0) + 1
-                supabase.table("issues").update({"news_count": count, "timemodified": "now()"}).eq("id", issue_id).execute()
-
-def update_issue_centroid(issue: dict, new_embedding: List[float]):
-    """Updates the centroid of an issue using a simple weighted average."""
-    centroid_data = issue.get("centroid_embedding")
-    
-    # Handle string format from database if necessary
-    if isinstance(centroid_data, str):
-        import json
-        try:
-            centroid_data = json.loads(centroid_data)
-        except Exception as e:
-            print(f"Error parsing centroid for issue {issue.get('id')}: {e}")
-            return # Cannot update if centroid is invalid
+def update_issue_centroid(issue: dict, new_embedding: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Updates the centroid of an issue in memory using a simple weighted average.
+    The issue dict is updated as well so later matches in the same run see the shifted centroid;
+    persisting it is left to IssueWriteBuffer.flush().
+    """
+    current_centroid = to_vector(issue_centroid(issue))
+    if current_centroid is None:
+        print(f"Error parsing centroid for issue {issue.get('id')}")
+        return None # Cannot update if centroid is invalid
             
-    current_centroid = np.array(centroid_data, dtype=np.float32)
-    new_v = np.array(new_embedding, dtype=np.float32)
-    count = issue.get("news_count", 1)
+    new_v = np.asarray(new_embedding, dtype=np.float32)
+    count = issue.get("news_count") or 1
     
     # New centroid = (old_centroid * count + new_embedding) / (count + 1)
     updated_centroid = (current_centroid * count + new_v) / (count + 1)
     
-    supabase.table("issues").update({
-        "centroid_embedding": updated_centroid.tolist(),
-        "timemodified": "now()"
-    }).eq("id", issue["id"]).execute()
+    issue["centroid_embedding"] = updated_centroid
+    issue.pop("centroid_compact", None)
+    issue["news_count"] = count + 1
+    return updated_centroid
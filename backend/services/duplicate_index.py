@@ -0,0 +1,161 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from db.supabase import supabase
+from utils.minhash import NUM_PERMUTATIONS, similarity, decode_signature
+
+# Estimated Jaccard similarity of the shingle sets above which two articles are the same story
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", 0.8))
+# LSH banding: 16 bands of 8 rows make pairs around 0.7 similarity likely to share a bucket
+LSH_BANDS = 16
+DUPLICATE_INDEX_MAX_ENTRIES = int(os.getenv("DUPLICATE_INDEX_MAX_ENTRIES", 20000))
+# Rows per request when loading the index
+LOAD_PAGE_SIZE = 1000
+
+_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+
+class DuplicateIndex:
+    """
+    MinHash LSH index over the most recent original (non-duplicate) articles.
+    Loaded from news.minhash on first use and kept up to date by ingestion;
+    the oldest entries are evicted beyond DUPLICATE_INDEX_MAX_ENTRIES.
+    The index lives in process memory: with several API workers (or the feed poller
+    running standalone) each process only sees the originals inserted since it loaded,
+    so a near-duplicate ingested by another worker can be missed until the next restart.
+    """
+
+    def __init__(self, max_entries: int, threshold: float):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self._signatures: "OrderedDict[int, np.ndarray]" = OrderedDict()
+        self._buckets: Dict[Tuple[int, bytes], set] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _bands(signature: np.ndarray):
+        for band in range(LSH_BANDS):
+            yield band, signature[band * _ROWS:(band + 1) * _ROWS].tobytes()
+
+    def _add(self, news_id: int, signature: np.ndarray):
+        self._signatures[news_id] = signature
+        for key in self._bands(signature):
+            self._buckets.setdefault(key, set()).add(news_id)
+        while len(self._signatures) > self.max_entries:
+            self._remove(next(iter(self._signatures)))
+
+    def _remove(self, news_id: int):
+        signature = self._signatures.pop(news_id, None)
+        if signature is None:
+            return
+        for key in self._bands(signature):
+            bucket = self._buckets.get(key)
+            if bucket:
+                bucket.discard(news_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        # PostgREST caps every response (1000 rows by default), so read newest-first in pages
+        rows = []
+        while len(rows) < self.max_entries:
+            start = len(rows)
+            end = min(start + LOAD_PAGE_SIZE, self.max_entries) - 1
+            res = supabase.table("news") \
+                .select("id, minhash") \
+                .is_("duplicate_of", "null") \
+                .not_.is_("minhash", "null") \
+                .order("id", desc=True) \
+                .range(start, end) \
+                .execute()
+            page = res.data or []
+            rows.extend(page)
+            if len(page) < end - start + 1:
+                break
+        for row in reversed(rows):
+            signature = decode_signature(row["minhash"])
+            if signature is not None:
+                self._add(row["id"], signature)
+        self._loaded = True
+
+    def load(self):
+        with self._lock:
+            self._ensure_loaded()
+
+    def start_loading(self) -> threading.Thread:
+        """Loads the index on a background thread, so the first ingest doesn't pay for it."""
+        thread = threading.Thread(target=self._load_quietly, name="duplicate-index-load", daemon=True)
+        thread.start()
+        return thread
+
+    def _load_quietly(self):
+        try:
+            self.load()
+        except Exception as e:
+            # The next assign() retries the load
+            print(f"⚠️ Duplicate index load failed: {e}")
+
+    def _find(self, signature: np.ndarray) -> Optional[int]:
+        candidates = set()
+        for key in self._bands(signature):
+            candidates |= self._buckets.get(key, set())
+        best_id, best_sim = None, self.threshold
+        for news_id in candidates:
+            sim = similarity(signature, self._signatures[news_id])
+            if sim >= best_sim:
+                best_id, best_sim = news_id, sim
+        return best_id
+
+    def assign(self, rows: List[dict]) -> Dict[int, int]:
+        """
+        Matches freshly inserted `{id, minhash}` rows, in order, against the index.
+        Returns {news id: original news id} for the near-duplicates; every other row
+        becomes an original itself, so later rows of the same batch can match it.
+        """
+        duplicates = {}
+        with self._lock:
+            self._ensure_loaded()
+            for row in rows:
+                signature = decode_signature(row.get("minhash"))
+                if signature is None:
+                    continue
+                original_id = self._find(signature)
+                if original_id is None:
+                    self._add(row["id"], signature)
+                else:
+                    duplicates[row["id"]] = original_id
+        return duplicates
+
+    def forget(self, news_id):
+        with self._lock:
+            for known_id in [i for i in self._signatures if str(i) == str(news_id)]:
+                self._remove(known_id)
+
+duplicate_index = DuplicateIndex(DUPLICATE_INDEX_MAX_ENTRIES, NEAR_DUPLICATE_THRESHOLD)
+
+def mark_near_duplicates(rows: List[dict]) -> Dict[int, int]:
+    """Flags inserted rows that repeat an earlier article by setting news.duplicate_of."""
+    try:
+        duplicates = duplicate_index.assign(rows)
+    except Exception as e:
+        print(f"⚠️ Near-duplicate check failed: {e}")
+        return {}
+    ids_by_original: Dict[int, List[int]] = {}
+    for news_id, original_id in duplicates.items():
+        ids_by_original.setdefault(original_id, []).append(news_id)
+    for original_id, ids in ids_by_original.items():
+        print(f"🪞 News {ids} near-duplicate of #{original_id}")
+        supabase.table("news").update({"duplicate_of": original_id}).in_("id", ids).execute()
+    return duplicates
+
+def originals_of(items: List[dict], columns: str) -> Dict[int, dict]:
+    """Fetches the given columns of the originals of items flagged as near-duplicates."""
+    original_ids = list({item["duplicate_of"] for item in items if item.get("duplicate_of")})
+    if not original_ids:
+        return {}
+    res = supabase.table("news").select(f"id, {columns}").in_("id", original_ids).execute()
+    return {row["id"]: row for row in res.data or []}
@@ -0,0 +1,289 @@
+"""
+Site-specific article extractors for the outlets in models.news.NewsSource.
+
+Each extractor is a set of XPath selectors (body, title, date, image, pagination)
+evaluated with lxml. scrape_news() uses the extractor registered for the article's
+domain and falls back to the generic newspaper3k path when there is none or the
+selectors find no body.
+
+Regression check and speed comparison against the generic path, on the fixture pages:
+    python -m services.extractors verify
+    python -m services.extractors bench
+
+Refresh a fixture from the live site (saves a trimmed copy and prints a draft
+expected.json entry to review and paste in):
+    python -m services.extractors record kompas_page2.html "https://...?page=2"
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import lxml.html
+from datetime import datetime
+from typing import List, Optional, Dict
+from urllib.parse import urljoin, urlparse
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "fixtures", "pages")
+
+# Shared fallbacks; most of these sites publish OpenGraph / article meta tags
+META_TITLE = ["//meta[@property='og:title']/@content", "//title/text()"]
+META_DATE = [
+    "//meta[@property='article:published_time']/@content",
+    "//meta[@name='publishdate']/@content",
+    "//meta[@name='pubdate']/@content",
+    "//meta[@name='content_PublishedDate']/@content",
+]
+META_IMAGE = ["//meta[@property='og:image']/@content"]
+
+# Boilerplate inside article bodies: scripts, embeds, "Baca juga" boxes, ads, captions
+DROP = [
+    ".//script", ".//style", ".//iframe", ".//noscript", ".//figure", ".//table",
+    ".//*[contains(@class, 'baca') or contains(@class, 'related') or contains(@class, 'ads') "
+    "or contains(@class, 'parallax') or contains(@class, 'caption') or contains(@class, 'video')]",
+]
+
+DATE_FORMATS = ["%Y/%m/%d %H:%M:%S", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"]
+
+def _parse_date(value: str) -> Optional[datetime]:
+    value = (value or "").strip()
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        pass
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    return None
+
+def _first(tree, xpaths: List[str]) -> str:
+    for xpath in xpaths:
+        for value in tree.xpath(xpath):
+            text = value if isinstance(value, str) else value.text_content()
+            text = text.strip()
+            if text:
+                return text
+    return ""
+
+class SiteExtractor:
+    def __init__(self, name: str, domains: List[str], body: List[str], title: List[str] = (),
+                 date: List[str] = (), image: List[str] = (), pagination: List[str] = (), drop: List[str] = ()):
+        self.name = name
+        self.domains = domains
+        self.body = list(body)
+        self.title = list(title) + META_TITLE
+        self.date = list(date) + META_DATE
+        self.image = list(image) + META_IMAGE
+        self.pagination = list(pagination)
+        self.drop = DROP + list(drop)
+
+    def body_text(self, tree) -> str:
+        for xpath in self.body:
+            nodes = tree.xpath(xpath)
+            if not nodes:
+                continue
+            paragraphs = []
+            for node in nodes:
+                for selector in self.drop:
+                    for junk in node.xpath(selector):
+                        junk.drop_tree()
+                texts = [p.text_content().strip() for p in node.xpath(".//p")]
+                texts = [t for t in texts if t] or [node.text_content().strip()]
+                paragraphs.extend(t for t in texts if t)
+            if paragraphs:
+                return "\n\n".join(paragraphs)
+        return ""
+
+    def extract(self, url: str, html: str) -> Optional[Dict]:
+        """Returns title/content/img_url/published_at/page_links, or None if no body matched."""
+        # `html` is already decoded with the response charset; an explicit parser encoding
+        # stops lxml from re-decoding the UTF-8 bytes with a stale <meta charset>
+        tree = lxml.html.fromstring(html.encode("utf-8"), parser=lxml.html.HTMLParser(encoding="utf-8"))
+        content = self.body_text(tree)
+        if not content:
+            return None
+
+        page_links = []
+        for xpath in self.pagination:
+            for href in tree.xpath(xpath):
+                link = urljoin(url, href.strip())
+                if link.rstrip("/") != url.rstrip("/") and link not in page_links:
+                    page_links.append(link)
+
+        published_at = _parse_date(_first(tree, self.date))
+        return {
+            "title": _first(tree, self.title),
+            "content": content,
+            "img_url": _first(tree, self.image) or None,
+            "published_at": published_at,
+            "page_links": page_links,
+        }
+
+def _has_class(name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+EXTRACTORS = [
+    SiteExtractor(
+        "CNN Indonesia", ["cnnindonesia.com"],
+        body=[f"//div[{_has_class('detail-text')}]", f"//div[{_has_class('detail_text')}]"],
+        title=["//h1/text()"],
+        drop=[".//p[starts-with(normalize-space(.), '[Gambas:')]"],
+    ),
+    SiteExtractor(
+        "Detik", ["detik.com"],
+        body=[f"//div[{_has_class('detail__body-text')}]", f"//div[{_has_class('itp_bodycontent')}]"],
+        title=[f"//h1[{_has_class('detail__title')}]/text()"],
+        pagination=[f"//div[{_has_class('detail__long-nav')}]//a/@href"],
+        drop=[f".//*[{_has_class('lihatjg')}]", ".//*[contains(@class, 'detail__body-tag')]"],
+    ),
+    SiteExtractor(
+        "Kompas", ["kompas.com"],
+        body=[f"//div[{_has_class('read__content')}]"],
+        title=[f"//h1[{_has_class('read__title')}]/text()"],
+        # Skip the prev arrow, the current page and the "show all" (?page=all) link
+        pagination=[f"//div[{_has_class('paging')}]//a[not({_has_class('paging__link--prev')}) "
+                    f"and not({_has_class('paging__link--active')}) and not(contains(@href, 'page=all'))]/@href"],
+        drop=[".//strong[starts-with(normalize-space(.), 'Baca juga')]/ancestor::p[1]"],
+    ),
+    SiteExtractor(
+        "Tempo", ["tempo.co"],
+        body=[f"//div[{_has_class('detail-konten')}]", "//div[@id='isi']", f"//div[{_has_class('detail-in')}]"],
+        title=[f"//h1[{_has_class('title')}]/text()", "//h1/text()"],
+        drop=[".//p[starts-with(normalize-space(.), 'Pilihan Editor')]"],
+    ),
+    SiteExtractor(
+        "Sindo", ["sindonews.com"],
+        body=[f"//div[{_has_class('detail-desc')}]", "//div[@id='content']"],
+        title=[f"//h1[{_has_class('detail-title')}]/text()", "//h1/text()"],
+        date=["//time/@datetime"],
+        pagination=[f"//div[{_has_class('pagination')}]//a/@href"],
+    ),
+    SiteExtractor(
+        "MetroTV News", ["metrotvnews.com"],
+        body=[f"//div[{_has_class('news-text')}]", "//div[@itemprop='articleBody']"],
+        title=["//h1/text()"],
+    ),
+]
+
+def get_extractor(url: str) -> Optional[SiteExtractor]:
+    host = urlparse(url).netloc.lower().split(":")[0]
+    for extractor in EXTRACTORS:
+        if any(host == d or host.endswith("." + d) for d in extractor.domains):
+            return extractor
+    return None
+
+def _load_fixtures() -> List[dict]:
+    with open(os.path.join(FIXTURE_DIR, "expected.json"), encoding="utf-8") as f:
+        fixtures = json.load(f)
+    for fixture in fixtures:
+        with open(os.path.join(FIXTURE_DIR, fixture["file"]), encoding="utf-8") as f:
+            fixture["html"] = f.read()
+    return fixtures
+
+def verify() -> bool:
+    ok = True
+    for fixture in _load_fixtures():
+        extractor = get_extractor(fixture["url"])
+        result = extractor.extract(fixture["url"], fixture["html"]) if extractor else None
+        problems = []
+        if not result:
+            problems.append("no body extracted")
+        else:
+            if result["title"] != fixture["title"]:
+                problems.append(f"title {result['title']!r}")
+            for snippet in fixture.get("contains", []):
+                if snippet not in result["content"]:
+                    problems.append(f"missing {snippet!r}")
+            for snippet in fixture.get("excludes", []):
+                if snippet in result["content"]:
+                    problems.append(f"boilerplate {snippet!r}")
+            if fixture.get("published_at") and (not result["published_at"] or result["published_at"].isoformat() != fixture["published_at"]):
+                problems.append(f"date {result['published_at']}")
+            if "page_links" in fixture and result["page_links"] != fixture["page_links"]:
+                problems.append(f"page links {result['page_links']}")
+        print(f"{'✅' if not problems else '❌'} {fixture['file']}: {', '.join(problems) or 'ok'}")
+        ok = ok and not problems
+    return ok
+
+def bench(rounds: int = 20):
+    from newspaper import Article
+    from bs4 import BeautifulSoup
+    for fixture in _load_fixtures():
+        extractor = get_extractor(fixture["url"])
+        started = time.perf_counter()
+        for _ in range(rounds):
+            extractor.extract(fixture["url"], fixture["html"])
+        site_ms = (time.perf_counter() - started) / rounds * 1000
+
+        started = time.perf_counter()
+        for _ in range(rounds):
+            article = Article(fixture["url"])
+            article.download(input_html=fixture["html"])
+            article.parse()
+            BeautifulSoup(fixture["html"], "lxml")
+        generic_ms = (time.perf_counter() - started) / rounds * 1000
+        print(f"{extractor.name:<14} site {site_ms:6.2f} ms   generic {generic_ms:6.2f} ms   ({generic_ms / site_ms:.1f}x)")
+
+def _trim(html: str) -> str:
+    """Drops head scripts/styles and empties inline ones so a saved page stays small."""
+    tree = lxml.html.fromstring(html.encode("utf-8"), parser=lxml.html.HTMLParser(encoding="utf-8"))
+    for node in tree.xpath("//head//script | //head//style | //link | //svg | //comment()"):
+        parent = node.getparent()
+        if parent is None:
+            continue
+        if node.tail:
+            previous = node.getprevious()
+            if previous is not None:
+                previous.tail = (previous.tail or "") + node.tail
+            else:
+                parent.text = (parent.text or "") + node.tail
+        parent.remove(node)
+    # Body scripts/styles stay as empty tags so the DROP selectors are still exercised
+    for node in tree.xpath("//script | //style"):
+        node.text = ""
+    return "<!DOCTYPE html>\n" + lxml.html.tostring(tree, encoding="unicode")
+
+async def _fetch_page(url: str) -> str:
+    from services.http_client import fetch, close_client
+    try:
+        return (await fetch(url, use_cache=False)).text
+    finally:
+        await close_client()
+
+def record(file: str, url: str):
+    extractor = get_extractor(url)
+    if extractor is None:
+        sys.exit(f"No extractor registered for {url}")
+    html = _trim(asyncio.run(_fetch_page(url)))
+    with open(os.path.join(FIXTURE_DIR, file), "w", encoding="utf-8") as f:
+        f.write(html)
+
+    result = extractor.extract(url, html)
+    if not result:
+        sys.exit(f"Saved {file}, but the {extractor.name} selectors found no body")
+    paragraphs = result["content"].split("\n\n")
+    entry = {
+        "file": file,
+        "url": url,
+        "title": result["title"],
+        "published_at": result["published_at"].isoformat() if result["published_at"] else None,
+        "contains": [p[:40] for p in paragraphs[:2] + paragraphs[-1:]],
+        "excludes": ["Baca juga", "Baca Juga", "ADVERTISEMENT"],
+        "page_links": result["page_links"],
+    }
+    print(json.dumps(entry, ensure_ascii=False, indent=4))
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "verify"
+    if command == "bench":
+        bench()
+    elif command == "record":
+        if len(sys.argv) != 4:
+            sys.exit("usage: python -m services.extractors record FILE URL")
+        record(sys.argv[2], sys.argv[3])
+    else:
+        sys.exit(0 if verify() else 1)
@@ -0,0 +1,273 @@
+"""
+Incremental RSS / Atom / news-sitemap poller for automatic ingestion.
+
+Every FEED_POLL_INTERVAL seconds each configured feed is fetched with a conditional
+GET (ETag / Last-Modified). Only entries newer than the feed's high-water mark, or
+not seen before when they carry no date, are handed to services.ingestion.ingest_urls,
+which skips known URLs and scrapes the rest with a per-domain rate limit.
+Feed state lives in SQLite so restarts never re-read old entries; entries that fail
+to ingest are not marked as seen and are retried on the next cycle.
+
+Enable inside the API with FEED_POLLER=1, or run standalone:
+    python -m services.feed_poller            # poll forever
+    python -m services.feed_poller --once     # one cycle, e.g. against fixtures/feed_server.py
+
+FEEDS_CONFIG may point to a JSON file of [{"source": "Detik", "url": "..."}] to
+replace the default feed list.
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import asyncio
+import threading
+import traceback
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import List, Optional, Tuple
+from lxml import etree
+from services.http_client import fetch, DomainRateLimiter
+from services.ingestion import ingest_urls
+
+FEED_POLLER_ENABLED = os.getenv("FEED_POLLER", "0") == "1"
+FEED_POLL_INTERVAL = float(os.getenv("FEED_POLL_INTERVAL", 300))
+FEED_DOMAIN_RATE_PER_MIN = float(os.getenv("FEED_DOMAIN_RATE_PER_MIN", 30))
+FEEDS_CONFIG = os.getenv("FEEDS_CONFIG")
+FEED_STATE_PATH = os.getenv(
+    "FEED_STATE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), ".model_cache", "feed_state.sqlite3"),
+)
+# Entry ids remembered per feed, for entries without a usable date
+SEEN_IDS_PER_FEED = 2000
+
+DEFAULT_FEEDS = [
+    {"source": "CNN Indonesia", "url": "https://www.cnnindonesia.com/nasional/rss"},
+    {"source": "Detik", "url": "https://news.detik.com/berita/rss"},
+    {"source": "Kompas", "url": "https://www.kompas.com/sitemap-news.xml"},
+    {"source": "Tempo", "url": "https://rss.tempo.co/nasional"},
+    {"source": "Sindo", "url": "https://nasional.sindonews.com/rss"},
+    {"source": "MetroTV News", "url": "https://www.metrotvnews.com/sitemap-news.xml"},
+]
+
+def load_feeds() -> List[dict]:
+    if FEEDS_CONFIG:
+        with open(FEEDS_CONFIG, encoding="utf-8") as f:
+            return json.load(f)
+    return DEFAULT_FEEDS
+
+def _parse_date(value: Optional[str]) -> Optional[datetime]:
+    value = (value or "").strip()
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)  # RSS: RFC 822
+    except (TypeError, ValueError):
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))  # Atom / sitemaps: ISO 8601
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+def _local(tag) -> str:
+    return etree.QName(tag).localname if isinstance(tag, str) else ""
+
+def _child_text(node, *names) -> Optional[str]:
+    for child in node.iter():
+        if _local(child.tag) in names and child.text and child.text.strip():
+            return child.text.strip()
+    return None
+
+def parse_feed(body: bytes) -> List[Tuple[str, str, Optional[datetime]]]:
+    """Returns (entry id, link, published) for RSS items, Atom entries and sitemap URLs."""
+    root = etree.fromstring(body, parser=etree.XMLParser(recover=True, resolve_entities=False, no_network=True))
+    if root is None:
+        return []
+    entries = []
+    for node in root.iter():
+        kind = _local(node.tag)
+        if kind == "item":  # RSS
+            link = _child_text(node, "link")
+            entry_id = _child_text(node, "guid") or link
+            published = _parse_date(_child_text(node, "pubDate", "date"))
+        elif kind == "entry":  # Atom
+            link_node = next((c for c in node if _local(c.tag) == "link" and c.get("rel", "alternate") == "alternate"), None)
+            link = link_node.get("href") if link_node is not None else None
+            entry_id = _child_text(node, "id") or link
+            published = _parse_date(_child_text(node, "published", "updated"))
+        elif kind == "url":  # (news) sitemap
+            link = _child_text(node, "loc")
+            entry_id = link
+            published = _parse_date(_child_text(node, "publication_date", "lastmod"))
+        else:
+            continue
+        if link:
+            entries.append((entry_id, link.strip(), published))
+    return entries
+
+class FeedState:
+    """Per-feed validators, high-water mark and recently seen entry ids, in SQLite."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS feeds (url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, "
+            "high_water TEXT, seen_ids TEXT NOT NULL DEFAULT '[]', polled_at REAL)"
+        )
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> dict:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, high_water, seen_ids FROM feeds WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return {"etag": None, "last_modified": None, "high_water": None, "seen_ids": []}
+        etag, last_modified, high_water, seen_ids = row
+        return {
+            "etag": etag,
+            "last_modified": last_modified,
+            "high_water": datetime.fromisoformat(high_water) if high_water else None,
+            "seen_ids": json.loads(seen_ids),
+        }
+
+    def save(self, url: str, state: dict):
+        high_water = state["high_water"].isoformat() if state["high_water"] else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO feeds VALUES (?, ?, ?, ?, ?, ?)",
+                (url, state["etag"], state["last_modified"], high_water,
+                 json.dumps(state["seen_ids"][-SEEN_IDS_PER_FEED:]), time.time()),
+            )
+
+class FeedPoller:
+    def __init__(self, feeds: List[dict], state: FeedState, interval: float = FEED_POLL_INTERVAL,
+                 rate_per_minute: float = FEED_DOMAIN_RATE_PER_MIN):
+        self.feeds = feeds
+        self.state = state
+        self.interval = interval
+        self.rate_limiter = DomainRateLimiter(rate_per_minute)
+        self.stats = {"cycles": 0, "not_modified": 0, "new_entries": 0, "ok": 0, "duplicate": 0, "failed": 0}
+
+    async def _fetch_feed(self, url: str, state: dict) -> Optional[Tuple[bytes, dict]]:
+        headers = {}
+        if state["etag"]:
+            headers["If-None-Match"] = state["etag"]
+        if state["last_modified"]:
+            headers["If-Modified-Since"] = state["last_modified"]
+        # Same size cap and per-domain limit as article scraping; the validators live in FeedState
+        page = await fetch(url, headers=headers, use_cache=False)
+        if page.status_code == 304:
+            self.stats["not_modified"] += 1
+            return None
+        if page.status_code != 200:
+            raise RuntimeError(f"HTTP {page.status_code}")
+        validators = {"etag": page.headers.get("etag"), "last_modified": page.headers.get("last-modified")}
+        return page.content, validators
+
+    async def poll_feed(self, feed: dict) -> Tuple[List[dict], Optional[dict], dict]:
+        """Returns the new entries of one feed, its saved state and the validators of this response."""
+        url = feed["url"]
+        state = self.state.get(url)
+        fetched = await self._fetch_feed(url, state)
+        if fetched is None:
+            return [], None, {}
+        body, validators = fetched
+
+        high_water = state["high_water"]
+        seen = set(state["seen_ids"])
+        entries = []
+        for entry_id, link, published in parse_feed(body):
+            if entry_id in seen:
+                continue
+            if published and high_water and published <= high_water:
+                continue
+            entries.append({"entry_id": entry_id, "link_article": link, "source": feed["source"], "published": published})
+            seen.add(entry_id)
+        return entries, state, validators
+
+    @staticmethod
+    def _advance(state: dict, entries: List[dict], validators: dict, stored: set):
+        """
+        Marks the stored entries of a feed as seen. Entries that failed to ingest stay new:
+        the high-water mark stops below the oldest of them and the old validators are kept,
+        so the next cycle fetches the feed again and retries them.
+        """
+        failed = [entry for entry in entries if entry["link_article"] not in stored]
+        oldest_failed = min((entry["published"] for entry in failed if entry["published"]), default=None)
+        for entry in entries:
+            if entry["link_article"] not in stored:
+                continue
+            state["seen_ids"].append(entry["entry_id"])
+            published = entry["published"]
+            if published and (oldest_failed is None or published < oldest_failed) \
+                    and (state["high_water"] is None or published > state["high_water"]):
+                state["high_water"] = published
+        if not failed:
+            state.update(validators)
+
+    async def poll_once(self) -> dict:
+        results = await asyncio.gather(*[self.poll_feed(feed) for feed in self.feeds], return_exceptions=True)
+
+        entries, polled = [], []
+        for feed, result in zip(self.feeds, results):
+            if isinstance(result, Exception):
+                print(f"❌ Feed {feed['url']} failed: {result}")
+                continue
+            feed_entries, state, validators = result
+            entries.extend(feed_entries)
+            if state is not None:
+                polled.append((feed["url"], state, feed_entries, validators))
+        print(f"📰 Feed poll: {len(entries)} new entries from {len(self.feeds)} feeds")
+        self.stats["new_entries"] += len(entries)
+
+        stored = set()
+        if entries:
+            items = [{"link_article": entry["link_article"], "source": entry["source"]} for entry in entries]
+            async for result in ingest_urls(items, rate_limiter=self.rate_limiter):
+                status = result.get("status")
+                if status in ("ok", "duplicate", "failed"):
+                    self.stats[status] += 1
+                if status in ("ok", "duplicate"):
+                    stored.add(result["link_article"])
+        # Advance the high-water marks only past entries that actually made it into the database
+        for url, state, feed_entries, validators in polled:
+            self._advance(state, feed_entries, validators, stored)
+            self.state.save(url, state)
+        self.stats["cycles"] += 1
+        return dict(self.stats)
+
+    async def run_forever(self):
+        while True:
+            started = time.monotonic()
+            try:
+                await self.poll_once()
+            except Exception:
+                traceback.print_exc()
+            await asyncio.sleep(max(0.0, self.interval - (time.monotonic() - started)))
+
+_poller: Optional[FeedPoller] = None
+
+def get_poller() -> FeedPoller:
+    global _poller
+    if _poller is None:
+        _poller = FeedPoller(load_feeds(), FeedState(FEED_STATE_PATH))
+    return _poller
+
+if __name__ == "__main__":
+    from services.http_client import close_client
+
+    async def main():
+        poller = get_poller()
+        try:
+            if "--once" in sys.argv:
+                print(await poller.poll_once())
+            else:
+                await poller.run_forever()
+        finally:
+            await close_client()
+
+    asyncio.run(main())
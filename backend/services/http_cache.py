@@ -0,0 +1,158 @@
+"""
+On-disk HTTP cache for scraped pages.
+
+Responses are kept in SQLite with their ETag / Last-Modified validators. Within
+SCRAPE_CACHE_TTL seconds a page is served straight from disk; after that it is
+revalidated with If-None-Match / If-Modified-Since, and a 304 reuses the stored body.
+The cache is bounded by SCRAPE_CACHE_MAX_BYTES with least-recently-used eviction.
+
+SCRAPE_CACHE_OFFLINE=1 serves only from the cache and never touches the network,
+so tests and benchmarks can run from a recorded cache of fixture pages:
+
+    SCRAPE_CACHE_PATH=fixtures/pages.sqlite3 python -m services.http_cache record URL [URL ...]
+    SCRAPE_CACHE_PATH=fixtures/pages.sqlite3 python -m services.http_cache import URL FILE.html
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import threading
+from typing import Optional, Dict, Any
+
+SCRAPE_CACHE_ENABLED = os.getenv("SCRAPE_CACHE", "1") != "0"
+SCRAPE_CACHE_PATH = os.getenv(
+    "SCRAPE_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), ".model_cache", "http_cache.sqlite3"),
+)
+SCRAPE_CACHE_TTL = float(os.getenv("SCRAPE_CACHE_TTL", 600))
+SCRAPE_CACHE_MAX_BYTES = int(os.getenv("SCRAPE_CACHE_MAX_BYTES", 200 * 1024 * 1024))
+SCRAPE_CACHE_OFFLINE = os.getenv("SCRAPE_CACHE_OFFLINE", "0") == "1"
+
+class CacheMiss(RuntimeError):
+    """Raised in offline mode when a URL has not been recorded."""
+
+class HttpCache:
+    def __init__(self, path: str, ttl: float, max_bytes: int):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        # Running size of all stored bodies, so writes never have to scan the table
+        self._total_bytes = 0
+        self.stats = {"fresh_hits": 0, "revalidated": 0, "misses": 0, "stored": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "url TEXT PRIMARY KEY, final_url TEXT NOT NULL, status_code INTEGER NOT NULL, "
+                "headers TEXT NOT NULL, body BLOB NOT NULL, etag TEXT, last_modified TEXT, "
+                "stored_at REAL NOT NULL, last_used REAL NOT NULL, size INTEGER NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS pages_last_used ON pages(last_used)")
+            self._total_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+            self._conn = conn
+        return self._conn
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT final_url, status_code, headers, body, etag, last_modified, stored_at FROM pages WHERE url = ?",
+                (url,),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE pages SET last_used = ? WHERE url = ?", (time.time(), url))
+        final_url, status_code, headers, body, etag, last_modified, stored_at = row
+        return {
+            "final_url": final_url,
+            "status_code": status_code,
+            "headers": json.loads(headers),
+            "body": body,
+            "etag": etag,
+            "last_modified": last_modified,
+            "stored_at": stored_at,
+        }
+
+    def contains(self, url: str) -> bool:
+        with self._lock:
+            return self._connect().execute("SELECT 1 FROM pages WHERE url = ?", (url,)).fetchone() is not None
+
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        return time.time() - entry["stored_at"] < self.ttl
+
+    def conditional_headers(self, entry: Dict[str, Any]) -> Dict[str, str]:
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def touch(self, url: str):
+        """Marks a revalidated (304) entry as fresh again."""
+        with self._lock:
+            now = time.time()
+            self._connect().execute("UPDATE pages SET stored_at = ?, last_used = ? WHERE url = ?", (now, now, url))
+
+    def put(self, url: str, final_url: str, status_code: int, headers: Dict[str, str], body: bytes):
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            replaced = conn.execute("SELECT size FROM pages WHERE url = ?", (url,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, final_url, status_code, json.dumps(headers), body,
+                 headers.get("etag"), headers.get("last-modified"), now, now, len(body)),
+            )
+            self._total_bytes += len(body) - (replaced[0] if replaced else 0)
+            self.stats["stored"] += 1
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection):
+        if self._total_bytes <= self.max_bytes:
+            return
+        excess = self._total_bytes - self.max_bytes
+        freed = 0
+        victims = []
+        for url, size in conn.execute("SELECT url, size FROM pages ORDER BY last_used"):
+            victims.append((url,))
+            freed += size
+            if freed >= excess:
+                break
+        conn.executemany("DELETE FROM pages WHERE url = ?", victims)
+        self._total_bytes -= freed
+
+cache = HttpCache(SCRAPE_CACHE_PATH, SCRAPE_CACHE_TTL, SCRAPE_CACHE_MAX_BYTES)
+
+def main():
+    import asyncio
+    from services.http_client import fetch, close_client
+
+    if len(sys.argv) < 3 or sys.argv[1] not in ("record", "import"):
+        print(__doc__)
+        sys.exit(1)
+
+    if sys.argv[1] == "import":
+        url, path = sys.argv[2], sys.argv[3]
+        with open(path, "rb") as f:
+            cache.put(url, url, 200, {"content-type": "text/html; charset=utf-8"}, f.read())
+        print(f"✅ Imported {path} as {url}")
+        return
+
+    async def record(urls):
+        for url in urls:
+            page = await fetch(url)
+            print(f"{page.status_code} {url}")
+        await close_client()
+
+    asyncio.run(record(sys.argv[2:]))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import os
+import re
+import asyncio
+import httpx
+from typing import NamedTuple, Optional, Dict
+from urllib.parse import urlparse
+from services.http_cache import cache as http_cache, CacheMiss, SCRAPE_CACHE_ENABLED, SCRAPE_CACHE_OFFLINE
+
+# Shared outbound HTTP client for scraping: one connection pool for the whole
+# process, kept-alive connections per host, hard timeouts and a response-size cap.
+SCRAPE_CONNECT_TIMEOUT = float(os.getenv("SCRAPE_CONNECT_TIMEOUT", 5))
+SCRAPE_READ_TIMEOUT = float(os.getenv("SCRAPE_READ_TIMEOUT", 15))
+SCRAPE_MAX_RESPONSE_BYTES = int(os.getenv("SCRAPE_MAX_RESPONSE_BYTES", 5 * 1024 * 1024))
+SCRAPE_MAX_CONNECTIONS = int(os.getenv("SCRAPE_MAX_CONNECTIONS", 50))
+SCRAPE_MAX_KEEPALIVE = int(os.getenv("SCRAPE_MAX_KEEPALIVE", 20))
+# Concurrent requests allowed against a single news site
+SCRAPE_PER_DOMAIN_CONCURRENCY = int(os.getenv("SCRAPE_PER_DOMAIN_CONCURRENCY", 4))
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36"
+}
+
+class ResponseTooLarge(RuntimeError):
+    pass
+
+class FetchedPage(NamedTuple):
+    url: str
+    status_code: int
+    text: str
+    headers: httpx.Headers
+    content: bytes = b""
+
+_client: Optional[httpx.AsyncClient] = None
+_domain_limits: Dict[str, asyncio.Semaphore] = {}
+
+def domain_limit(url: str) -> asyncio.Semaphore:
+    """Semaphore bounding concurrent requests to the host of `url`."""
+    host = urlparse(url).netloc.lower()
+    if host not in _domain_limits:
+        _domain_limits[host] = asyncio.Semaphore(SCRAPE_PER_DOMAIN_CONCURRENCY)
+    return _domain_limits[host]
+
+def get_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            headers=DEFAULT_HEADERS,
+            timeout=httpx.Timeout(SCRAPE_READ_TIMEOUT, connect=SCRAPE_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=SCRAPE_MAX_CONNECTIONS, max_keepalive_connections=SCRAPE_MAX_KEEPALIVE),
+            follow_redirects=True,
+        )
+    return _client
+
+class DomainRateLimiter:
+    """Spaces out request starts per host so that at most `per_minute` begin each minute."""
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next_slot: Dict[str, float] = {}
+        self._lock = asyncio.Lock()
+
+    async def wait(self, url: str):
+        if not self.interval:
+            return
+        host = urlparse(url).netloc.lower()
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            now = loop.time()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+def _page_from_cache(entry: dict) -> FetchedPage:
+    headers = httpx.Headers(entry["headers"])
+    charset = re.search(r"charset=([\w-]+)", headers.get("content-type", ""))
+    encoding = charset.group(1) if charset else "utf-8"
+    try:
+        text = entry["body"].decode(encoding, errors="replace")
+    except LookupError:
+        # Sites declare charsets Python doesn't know (e.g. "utf8mb4")
+        text = entry["body"].decode("utf-8", errors="replace")
+    return FetchedPage(entry["final_url"], entry["status_code"], text, headers, entry["body"])
+
+async def fetch(url: str, headers: Optional[dict] = None, use_cache: bool = True) -> FetchedPage:
+    """
+    GETs a page, aborting once the body exceeds SCRAPE_MAX_RESPONSE_BYTES.
+    Goes through the on-disk HTTP cache (services/http_cache.py) when enabled and
+    `use_cache` is set; callers doing their own conditional GETs pass use_cache=False.
+    Cache reads and writes (SQLite, bodies up to the size cap) run on a worker thread.
+    """
+    use_cache = use_cache and SCRAPE_CACHE_ENABLED
+    entry = await asyncio.to_thread(http_cache.get, url) if use_cache else None
+    if entry is not None and (SCRAPE_CACHE_OFFLINE or http_cache.is_fresh(entry)):
+        http_cache.stats["fresh_hits"] += 1
+        return _page_from_cache(entry)
+    if use_cache and SCRAPE_CACHE_OFFLINE:
+        raise CacheMiss(f"{url} is not in the offline HTTP cache")
+
+    request_headers = dict(headers or {})
+    if entry is not None:
+        request_headers.update(http_cache.conditional_headers(entry))
+
+    async with domain_limit(url), get_client().stream("GET", url, headers=request_headers) as response:
+        if response.status_code == 304 and entry is not None:
+            http_cache.stats["revalidated"] += 1
+            await asyncio.to_thread(http_cache.touch, url)
+            return _page_from_cache(entry)
+
+        declared = response.headers.get("content-length")
+        if declared and declared.isdigit() and int(declared) > SCRAPE_MAX_RESPONSE_BYTES:
+            raise ResponseTooLarge(f"{url} is {declared} bytes (limit {SCRAPE_MAX_RESPONSE_BYTES})")
+
+        body = bytearray()
+        async for chunk in response.aiter_bytes():
+            body.extend(chunk)
+            if len(body) > SCRAPE_MAX_RESPONSE_BYTES:
+                raise ResponseTooLarge(f"{url} exceeded {SCRAPE_MAX_RESPONSE_BYTES} bytes")
+
+        if use_cache:
+            http_cache.stats["misses"] += 1
+            if response.status_code == 200:
+                await asyncio.to_thread(http_cache.put, url, str(response.url), 200, dict(response.headers), bytes(body))
+
+        text = bytes(body).decode(response.encoding or "utf-8", errors="replace")
+        return FetchedPage(str(response.url), response.status_code, text, response.headers, bytes(body))
+
+async def head_ok(url: str, timeout: float = 3) -> bool:
+    """Cheap existence check used by pagination probing."""
+    if SCRAPE_CACHE_ENABLED and await asyncio.to_thread(http_cache.contains, url):
+        return True
+    if SCRAPE_CACHE_OFFLINE:
+        return False
+    try:
+        async with domain_limit(url):
+            response = await get_client().head(url, timeout=timeout)
+        return response.status_code == 200
+    except httpx.HTTPError:
+        return False
@@ -0,0 +1,141 @@
+import os
+import sqlite3
+import hashlib
+import threading
+import time
+from typing import Callable, List, Optional, Dict, Any
+
+# Persistent cache of classifier labels and embeddings keyed by a hash of the
+# cleaned text plus the model id, so unchanged and syndicated articles are
+# never run through the models twice. LLM completions are cached here per prompt too.
+INFERENCE_CACHE_ENABLED = os.getenv("INFERENCE_CACHE", "1") != "0"
+INFERENCE_CACHE_PATH = os.getenv(
+    "INFERENCE_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), ".model_cache", "inference_cache.sqlite3"),
+)
+INFERENCE_CACHE_MAX_ENTRIES = int(os.getenv("INFERENCE_CACHE_MAX_ENTRIES", 200000))
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class InferenceCache:
+    """SQLite-backed key/value store with least-recently-used eviction and hit counters."""
+
+    def __init__(self, path: str, max_entries: int):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writes_since_evict = 0
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, kind TEXT NOT NULL, value BLOB NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_last_used ON cache(last_used)")
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def _key(kind: str, model_id: str, text: str) -> str:
+        return f"{kind}:{model_id}:{content_hash(text)}"
+
+    def get_many(self, kind: str, model_id: str, texts: List[str]) -> List[Optional[bytes]]:
+        keys = [self._key(kind, model_id, t) for t in texts]
+        found = {}
+        with self._lock:
+            conn = self._connect()
+            unique = list(set(keys))
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(unique), 500):
+                chunk = unique[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(f"SELECT key, value FROM cache WHERE key IN ({placeholders})", chunk).fetchall()
+                found.update(rows)
+                if rows:
+                    conn.execute(
+                        f"UPDATE cache SET last_used = ? WHERE key IN ({','.join('?' * len(rows))})",
+                        [time.time()] + [k for k, _ in rows],
+                    )
+            hits = sum(1 for k in keys if k in found)
+            self.hits[kind] = self.hits.get(kind, 0) + hits
+            self.misses[kind] = self.misses.get(kind, 0) + len(keys) - hits
+        return [found.get(k) for k in keys]
+
+    def put_many(self, kind: str, model_id: str, texts: List[str], values: List[bytes]):
+        now = time.time()
+        rows = [(self._key(kind, model_id, t), kind, v, now) for t, v in zip(texts, values)]
+        with self._lock:
+            conn = self._connect()
+            conn.executemany("INSERT OR REPLACE INTO cache (key, kind, value, last_used) VALUES (?, ?, ?, ?)", rows)
+            self._writes_since_evict += len(rows)
+            # Evicting on every write would scan the index each time; batch it
+            if self._writes_since_evict >= max(1, self.max_entries // 100):
+                self._writes_since_evict = 0
+                self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection):
+        count = conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        result = {}
+        for kind in set(self.hits) | set(self.misses):
+            hits, misses = self.hits.get(kind, 0), self.misses.get(kind, 0)
+            total = hits + misses
+            result[kind] = {"hits": hits, "misses": misses, "hit_rate": round(hits / total, 3) if total else 0.0}
+        return result
+
+cache = InferenceCache(INFERENCE_CACHE_PATH, INFERENCE_CACHE_MAX_ENTRIES)
+
+def cached_batch(
+    kind: str,
+    model_id: str,
+    keys: List[str],
+    compute: Callable[[List[int]], list],
+    encode: Callable[[Any], bytes],
+    decode: Callable[[bytes], Any],
+) -> list:
+    """
+    Returns one result per key, taking cached values where possible.
+    `compute` receives the indexes of the misses and must return their results in order.
+    """
+    if not INFERENCE_CACHE_ENABLED:
+        return compute(list(range(len(keys))))
+
+    try:
+        cached = cache.get_many(kind, model_id, keys)
+    except sqlite3.Error as e:
+        print(f"⚠️ Inference cache read failed: {e}")
+        return compute(list(range(len(keys))))
+
+    results = [decode(v) if v is not None else None for v in cached]
+    # Identical texts within one batch (syndicated copies) are computed once
+    missing_by_key: Dict[str, List[int]] = {}
+    for i, v in enumerate(cached):
+        if v is None:
+            missing_by_key.setdefault(keys[i], []).append(i)
+    if missing_by_key:
+        representatives = [indexes[0] for indexes in missing_by_key.values()]
+        computed = compute(representatives)
+        for indexes, value in zip(missing_by_key.values(), computed):
+            for i in indexes:
+                results[i] = value
+        try:
+            cache.put_many(kind, model_id, list(missing_by_key), [encode(v) for v in computed])
+        except sqlite3.Error as e:
+            print(f"⚠️ Inference cache write failed: {e}")
+    return results
@@ -0,0 +1,42 @@
+import os
+import httpx
+from typing import List, Optional
+
+# When set, classification and embedding are delegated to the shared inference
+# server (see inference_server.py) instead of loading the models in this process.
+INFERENCE_SERVER_URL = os.getenv("INFERENCE_SERVER_URL")
+INFERENCE_SERVER_UDS = os.getenv("INFERENCE_SERVER_UDS")
+INFERENCE_TIMEOUT = float(os.getenv("INFERENCE_TIMEOUT", 120))
+# Readiness probes must answer quickly even while the server is busy
+INFERENCE_STATUS_TIMEOUT = float(os.getenv("INFERENCE_STATUS_TIMEOUT", 2))
+
+_client: Optional[httpx.Client] = None
+
+def enabled() -> bool:
+    return bool(INFERENCE_SERVER_URL or INFERENCE_SERVER_UDS)
+
+def _get_client() -> httpx.Client:
+    global _client
+    if _client is None:
+        if INFERENCE_SERVER_UDS:
+            # Host part of the URL is ignored when talking over a Unix socket
+            transport = httpx.HTTPTransport(uds=INFERENCE_SERVER_UDS)
+            _client = httpx.Client(transport=transport, base_url="http://inference", timeout=INFERENCE_TIMEOUT)
+        else:
+            _client = httpx.Client(base_url=INFERENCE_SERVER_URL, timeout=INFERENCE_TIMEOUT)
+    return _client
+
+def _post(path: str, texts: List[str]) -> dict:
+    res = _get_client().post(path, json={"texts": texts})
+    res.raise_for_status()
+    return res.json()
+
+def classify(contents: List[str]) -> List[str]:
+    return _post("/classify", contents)["labels"]
+
+def embed(texts: List[str]) -> List[List[float]]:
+    return _post("/embed", texts)["embeddings"]
+
+def status(timeout: float = INFERENCE_STATUS_TIMEOUT) -> dict:
+    res = _get_client().get("/health/ready", timeout=timeout)
+    return res.json()
@@ -0,0 +1,122 @@
+import os
+import time
+import asyncio
+from datetime import datetime, timezone
+from typing import List, AsyncIterator, Optional
+from db.supabase import supabase
+from services.scraping import scrape_news
+from services.url_index import url_index
+from services.http_client import DomainRateLimiter
+from services.duplicate_index import mark_near_duplicates
+from utils.url_utils import canonicalize_url, page_base_url
+from utils.minhash import text_signature
+
+# How many URLs of one batch are scraped at the same time
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", 8))
+# Scraped rows are inserted in groups of this size
+INGEST_INSERT_BATCH = int(os.getenv("INGEST_INSERT_BATCH", 10))
+
+def build_news_row(link_article: str, source: str, scraped_data: dict) -> dict:
+    """Maps scrape_news() output to a `news` row."""
+    return {
+        "link_article": link_article,
+        "source": source,
+        "title": scraped_data["title"],
+        "content": scraped_data["content"],
+        "img_url": scraped_data["img_url"],
+        "published_at": scraped_data["published_at"] if scraped_data["published_at"] else datetime.now(timezone.utc).isoformat(),
+        "label": None,
+        "canonical_url": canonicalize_url(link_article) or None,
+        "minhash": text_signature(scraped_data["content"])
+    }
+
+async def ingest_urls(items: List[dict], rate_limiter: Optional[DomainRateLimiter] = None) -> AsyncIterator[dict]:
+    """
+    Scrapes and stores a batch of `{link_article, source}` items concurrently.
+    Yields one result per URL as soon as it is known (status ok / duplicate / failed
+    plus timing), followed by a final summary.
+    An optional rate limiter spaces out the scrapes per news site.
+    """
+    started = time.perf_counter()
+    counts = {"ok": 0, "duplicate": 0, "failed": 0}
+
+    # Known articles are skipped before any network fetch
+    known = url_index.lookup_many(item["link_article"] for item in items)
+
+    queue: List[dict] = []
+    seen = set()
+    for item in items:
+        link = item["link_article"]
+        canonical = canonicalize_url(link)
+        # A later page of an article from the same batch counts as that article
+        if link in known or canonical in seen or page_base_url(canonical) in seen:
+            counts["duplicate"] += 1
+            yield {"link_article": link, "status": "duplicate", "news_id": known.get(link), "elapsed_ms": 0}
+            continue
+        seen.add(canonical)
+        queue.append(item)
+
+    semaphore = asyncio.Semaphore(INGEST_CONCURRENCY)
+
+    async def scrape_one(item: dict):
+        if rate_limiter:
+            await rate_limiter.wait(item["link_article"])
+        async with semaphore:
+            item_started = time.perf_counter()
+            try:
+                scraped_data = await scrape_news(item["link_article"])
+                row = build_news_row(item["link_article"], item["source"], scraped_data)
+                return item, row, None, time.perf_counter() - item_started
+            except Exception as e:
+                return item, None, str(e), time.perf_counter() - item_started
+
+    pending_rows = []
+
+    def flush() -> List[dict]:
+        rows = [row for _, row, _ in pending_rows]
+        results = []
+        try:
+            # Rows whose canonical URL was stored concurrently are skipped, not failed
+            res = supabase.table("news") \
+                .upsert(rows, on_conflict="canonical_url", ignore_duplicates=True) \
+                .execute()
+            ids = {row["link_article"]: row["id"] for row in res.data or []}
+            duplicates = mark_near_duplicates(res.data or [])
+            for item, row, elapsed in pending_rows:
+                news_id = ids.get(row["link_article"])
+                if news_id is None:
+                    counts["duplicate"] += 1
+                    results.append({"link_article": item["link_article"], "status": "duplicate", "elapsed_ms": round(elapsed * 1000)})
+                    continue
+                url_index.remember(row["canonical_url"], news_id)
+                counts["ok"] += 1
+                results.append({"link_article": item["link_article"], "status": "ok", "news_id": news_id, "title": row["title"], "duplicate_of": duplicates.get(news_id), "elapsed_ms": round(elapsed * 1000)})
+        except Exception as e:
+            for item, row, elapsed in pending_rows:
+                counts["failed"] += 1
+                results.append({"link_article": item["link_article"], "status": "failed", "error": f"Insert failed: {e}", "elapsed_ms": round(elapsed * 1000)})
+        pending_rows.clear()
+        return results
+
+    tasks = [asyncio.create_task(scrape_one(item)) for item in queue]
+    try:
+        for task in asyncio.as_completed(tasks):
+            item, row, error, elapsed = await task
+            if error:
+                counts["failed"] += 1
+                yield {"link_article": item["link_article"], "status": "failed", "error": error, "elapsed_ms": round(elapsed * 1000)}
+                continue
+            pending_rows.append((item, row, elapsed))
+            if len(pending_rows) >= INGEST_INSERT_BATCH:
+                for result in await asyncio.to_thread(flush):
+                    yield result
+    finally:
+        # The consumer went away (e.g. the NDJSON client disconnected): stop scraping for it
+        for task in tasks:
+            task.cancel()
+
+    if pending_rows:
+        for result in await asyncio.to_thread(flush):
+            yield result
+
+    yield {"status": "done", "counts": counts, "elapsed_ms": round((time.perf_counter() - started) * 1000)}
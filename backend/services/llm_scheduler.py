@@ -0,0 +1,246 @@
+"""
+Process-wide scheduler for LLM (Groq) calls.
+
+Every completion goes through one LLMScheduler, which enforces:
+  * token buckets for requests/min and tokens/min (LLM_REQUESTS_PER_MIN, LLM_TOKENS_PER_MIN)
+  * at most LLM_CONCURRENCY calls in flight
+  * priority lanes: admin-triggered work is dispatched before batch work
+  * a shared pause on 429s, honouring Retry-After, instead of per-call backoff
+  * a circuit breaker that fails fast while the provider keeps erroring
+
+The lane is taken from a context variable, so an endpoint only has to call
+set_priority(ADMIN) once; tasks it spawns (asyncio.gather) inherit it.
+"""
+import os
+import time
+import heapq
+import random
+import asyncio
+import itertools
+import contextvars
+from typing import Awaitable, Callable, Optional, TypeVar
+
+LLM_REQUESTS_PER_MIN = float(os.getenv("LLM_REQUESTS_PER_MIN", 30))
+LLM_TOKENS_PER_MIN = float(os.getenv("LLM_TOKENS_PER_MIN", 6000))
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", 4))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 3))
+# Consecutive provider failures that open the circuit, and how long it stays open
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", 5))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", 30))
+# Pause after a 429 without a Retry-After header
+DEFAULT_RETRY_AFTER = 5.0
+
+ADMIN, BATCH = 0, 1
+_priority: contextvars.ContextVar = contextvars.ContextVar("llm_priority", default=BATCH)
+
+T = TypeVar("T")
+
+def set_priority(priority: int):
+    """Sets the lane for LLM calls made by the current request / task."""
+    _priority.set(priority)
+
+class LLMUnavailable(Exception):
+    """Raised without calling the provider while the circuit breaker is open."""
+
+class LLMRequestTooLarge(ValueError):
+    """Raised for a request whose token estimate exceeds LLM_TOKENS_PER_MIN; it could never be sent."""
+
+class TokenBucket:
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = per_minute
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` can be taken (requests larger than the bucket wait for a full one)."""
+        self._refill()
+        missing = min(amount, self.capacity) - self.tokens
+        return max(0.0, missing / self.rate) if self.rate > 0 else 0.0
+
+    def take(self, amount: float):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+def _status_code(error: Exception) -> Optional[int]:
+    return getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+
+def _retry_after(error: Exception) -> float:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return max(0.0, float(headers.get("retry-after")))
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER
+
+def _is_provider_failure(error: Exception) -> bool:
+    """Errors that say the provider is unhealthy (5xx, timeouts, connection errors), not the request."""
+    status = _status_code(error)
+    if status is not None:
+        return status >= 500
+    return isinstance(error, (ConnectionError, TimeoutError, asyncio.TimeoutError)) \
+        or type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+class LLMScheduler:
+    def __init__(self, requests_per_min: float, tokens_per_min: float, concurrency: int,
+                 breaker_threshold: int, breaker_cooldown: float):
+        self.requests = TokenBucket(requests_per_min)
+        self.tokens = TokenBucket(tokens_per_min)
+        self.concurrency = concurrency
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self._active = 0
+        self._waiters = []
+        self._seq = itertools.count()
+        self._paused_until = 0.0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self.stats = {"calls": 0, "rate_limited": 0, "failures": 0, "rejected": 0, "retries": 0}
+
+    # --- circuit breaker -------------------------------------------------
+
+    @property
+    def circuit(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.breaker_cooldown:
+            return "open"
+        return "half_open"
+
+    def _check_circuit(self) -> bool:
+        """Raises while the circuit is open; returns True if this call is the half-open probe."""
+        state = self.circuit
+        # Half-open: let a single probe through; everyone else keeps failing fast
+        if state == "open" or (state == "half_open" and self._probing):
+            self.stats["rejected"] += 1
+            raise LLMUnavailable("LLM provider unavailable (circuit open)")
+        if state == "half_open":
+            self._probing = True
+            return True
+        return False
+
+    def _record_success(self):
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    def _record_failure(self):
+        self.stats["failures"] += 1
+        self._failures += 1
+        self._probing = False
+        if self._failures >= self.breaker_threshold or self._opened_at is not None:
+            if self._opened_at is None:
+                print(f"❌ LLM circuit opened after {self._failures} consecutive failures")
+            self._opened_at = time.monotonic()
+
+    # --- dispatching -----------------------------------------------------
+
+    def _dispatch(self):
+        self._timer = None
+        while self._waiters and self._active < self.concurrency:
+            priority, seq, amount, future = self._waiters[0]
+            if future.done():  # cancelled while waiting
+                heapq.heappop(self._waiters)
+                continue
+            delay = max(
+                self._paused_until - time.monotonic(),
+                self.requests.wait_time(1),
+                self.tokens.wait_time(amount),
+            )
+            if delay > 0:
+                # Strict priority: nothing overtakes the head of the queue
+                self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                return
+            heapq.heappop(self._waiters)
+            self.requests.take(1)
+            self.tokens.take(amount)
+            self._active += 1
+            future.set_result(None)
+
+    def _wake(self):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._dispatch()
+
+    async def _acquire(self, amount: int):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (_priority.get(), next(self._seq), amount, future))
+        self._wake()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release()
+            raise
+
+    def _release(self):
+        self._active -= 1
+        self._wake()
+
+    def pause(self, seconds: float):
+        """Holds back every lane, e.g. for the Retry-After of a 429."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def run(self, call: Callable[[], Awaitable[T]], tokens: int, retries: int = LLM_MAX_RETRIES) -> T:
+        """
+        Runs `call` (a fresh provider request per attempt) once a slot, a request and
+        `tokens` are available (requests larger than the per-minute token limit raise
+        LLMRequestTooLarge instead of waiting forever). 429s pause the whole scheduler for Retry-After and are
+        retried; 5xx / connection errors count towards the circuit breaker.
+        """
+        if tokens > self.tokens.capacity:
+            raise LLMRequestTooLarge(
+                f"LLM request of ~{tokens} tokens exceeds LLM_TOKENS_PER_MIN={self.tokens.capacity:g}"
+            )
+        for attempt in range(retries):
+            took_probe = self._check_circuit()
+            try:
+                await self._acquire(tokens)
+                try:
+                    self.stats["calls"] += 1
+                    result = await call()
+                except Exception as e:
+                    last_attempt = attempt == retries - 1
+                    if _status_code(e) == 429:
+                        self.stats["rate_limited"] += 1
+                        wait = _retry_after(e)
+                        print(f"⚠️ LLM rate limited, pausing all calls for {wait:.1f}s (attempt {attempt + 1}/{retries})")
+                        self.pause(wait)
+                    elif _is_provider_failure(e):
+                        self._record_failure()
+                        if not last_attempt:
+                            self.pause(min(2 ** attempt + random.uniform(0, 1), self.breaker_cooldown))
+                    else:
+                        raise
+                    if last_attempt:
+                        raise
+                    self.stats["retries"] += 1
+                    continue
+                finally:
+                    self._release()
+                self._record_success()
+                return result
+            finally:
+                # Whatever ended the probe (including cancellation), let the next call probe again
+                if took_probe:
+                    self._probing = False
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "circuit": self.circuit,
+            "active": self._active,
+            "waiting": len(self._waiters),
+            "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 1),
+        }
+
+llm_scheduler = LLMScheduler(
+    LLM_REQUESTS_PER_MIN, LLM_TOKENS_PER_MIN, LLM_CONCURRENCY,
+    LLM_BREAKER_THRESHOLD, LLM_BREAKER_COOLDOWN,
+)
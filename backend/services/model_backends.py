@@ -0,0 +1,144 @@
+"""
+Selectable CPU inference backends for the classifier and the embedder.
+
+INFERENCE_BACKEND:
+    torch  - full precision PyTorch eager models (default)
+    int8   - PyTorch dynamic int8 quantization of every nn.Linear
+    onnx   - ONNX Runtime, exported once into MODEL_CACHE_DIR
+             (needs `pip install optimum[onnxruntime]`)
+
+One-time export and agreement check (from the backend directory):
+    python -m services.model_backends export
+    python -m services.model_backends verify --backend onnx
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import torch
+import numpy as np
+
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch").lower()
+MODEL_CACHE_DIR = os.getenv("MODEL_CACHE_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), ".model_cache"))
+BACKENDS = ("torch", "int8", "onnx")
+
+FIXTURE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "fixtures", "bias_samples.json")
+
+def _check_backend(backend: str):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown INFERENCE_BACKEND '{backend}', expected one of {BACKENDS}")
+
+def _onnx_dir(name: str) -> str:
+    return os.path.join(MODEL_CACHE_DIR, "onnx", name)
+
+def _import_ort_classifier():
+    try:
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+    except ImportError as e:
+        raise RuntimeError("INFERENCE_BACKEND=onnx requires `pip install optimum[onnxruntime]`") from e
+    return ORTModelForSequenceClassification
+
+def export_classifier_onnx(repo_id: str) -> str:
+    from transformers import AutoTokenizer
+    ORTModelForSequenceClassification = _import_ort_classifier()
+    path = _onnx_dir("classifier")
+    if not os.path.exists(os.path.join(path, "model.onnx")):
+        print(f"📦 Exporting {repo_id} to ONNX at {path}")
+        model = ORTModelForSequenceClassification.from_pretrained(repo_id, export=True)
+        model.save_pretrained(path)
+        AutoTokenizer.from_pretrained(repo_id).save_pretrained(path)
+    return path
+
+def export_embedder_onnx(model_id: str) -> str:
+    from sentence_transformers import SentenceTransformer
+    path = _onnx_dir("embedder")
+    if not os.path.exists(path):
+        print(f"📦 Exporting {model_id} to ONNX at {path}")
+        SentenceTransformer(model_id, backend="onnx").save(path)
+    return path
+
+def load_classifier(repo_id: str, backend: str = INFERENCE_BACKEND):
+    """Returns (tokenizer, model); model(**inputs).logits works the same for every backend."""
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+    _check_backend(backend)
+
+    if backend == "onnx":
+        ORTModelForSequenceClassification = _import_ort_classifier()
+        path = export_classifier_onnx(repo_id)
+        return AutoTokenizer.from_pretrained(path), ORTModelForSequenceClassification.from_pretrained(path)
+
+    tokenizer = AutoTokenizer.from_pretrained(repo_id)
+    model = AutoModelForSequenceClassification.from_pretrained(repo_id)
+    model.eval()
+    if backend == "int8":
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return tokenizer, model
+
+def load_embedder(model_id: str, backend: str = INFERENCE_BACKEND):
+    from sentence_transformers import SentenceTransformer
+    _check_backend(backend)
+
+    if backend == "onnx":
+        return SentenceTransformer(export_embedder_onnx(model_id), backend="onnx")
+
+    model = SentenceTransformer(model_id)
+    if backend == "int8":
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+def _run_classifier(tokenizer, model, texts):
+    from services.classification import clean_text, id2label, MAX_LENGTH
+    labels = []
+    started = time.perf_counter()
+    with torch.inference_mode():
+        for text in texts:
+            inputs = tokenizer(clean_text(text), return_tensors="pt", truncation=True, max_length=MAX_LENGTH)
+            logits = model(**inputs).logits
+            labels.append(id2label[int(torch.argmax(logits, dim=1).item())])
+    return labels, (time.perf_counter() - started) / len(texts)
+
+def verify(backend: str, fixture_path: str = FIXTURE_PATH, min_agreement: float = 0.95) -> bool:
+    """Checks that `backend` agrees with the eager model on the fixture articles."""
+    from services.classification import repo_id
+    from services.clustering import EMBEDDING_MODEL_ID
+
+    with open(fixture_path, encoding="utf-8") as f:
+        texts = [sample["content"] for sample in json.load(f)]
+
+    eager_labels, eager_latency = _run_classifier(*load_classifier(repo_id, "torch"), texts)
+    labels, latency = _run_classifier(*load_classifier(repo_id, backend), texts)
+    agreement = sum(a == b for a, b in zip(eager_labels, labels)) / len(texts)
+    print(f"🏷️ Classifier labels agree on {agreement:.0%} of {len(texts)} fixtures "
+          f"({eager_latency * 1000:.0f} ms -> {latency * 1000:.0f} ms per article)")
+
+    eager_emb = load_embedder(EMBEDDING_MODEL_ID, "torch").encode(texts, normalize_embeddings=True)
+    emb = load_embedder(EMBEDDING_MODEL_ID, backend).encode(texts, normalize_embeddings=True)
+    min_cos = float(np.min(np.sum(eager_emb * emb, axis=1)))
+    print(f"🧮 Embeddings: minimum cosine similarity to eager model {min_cos:.4f}")
+
+    return agreement >= min_agreement and min_cos >= 0.98
+
+def main():
+    parser = argparse.ArgumentParser(description="Export and verify CPU inference backends.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("export", help="Export both models to ONNX into MODEL_CACHE_DIR")
+    check = sub.add_parser("verify", help="Compare a backend against the eager model on fixtures")
+    check.add_argument("--backend", choices=BACKENDS, default=INFERENCE_BACKEND)
+    check.add_argument("--fixtures", default=FIXTURE_PATH)
+    args = parser.parse_args()
+
+    from services.classification import repo_id
+    from services.clustering import EMBEDDING_MODEL_ID
+
+    if args.command == "export":
+        export_classifier_onnx(repo_id)
+        export_embedder_onnx(EMBEDDING_MODEL_ID)
+        print(f"✅ ONNX models cached in {MODEL_CACHE_DIR}")
+    elif args.command == "verify":
+        ok = verify(args.backend, args.fixtures)
+        print("✅ Backend agrees with eager model" if ok else "❌ Backend disagrees with eager model")
+        sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import os
+import threading
+import time
+import traceback
+from typing import Callable, Dict, Any
+
+# Read-only replicas can set ENABLE_ML_MODELS=0 to never load the transformers
+ENABLE_ML_MODELS = os.getenv("ENABLE_ML_MODELS", "1") != "0"
+# Load every registered model in a background thread right after startup
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "0") == "1"
+
+NOT_LOADED = "not_loaded"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+DISABLED = "disabled"
+
+class ModelRegistry:
+    """
+    Loads ML models on first use instead of at import time.
+    Each model has its own lock, so a request that needs the classifier never
+    waits for the embedder to load (and the API itself never waits for either).
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._models: Dict[str, Any] = {}
+        self._states: Dict[str, dict] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+
+    def register(self, name: str, loader: Callable[[], Any]):
+        self._loaders[name] = loader
+        self._locks.setdefault(name, threading.Lock())
+        self._states.setdefault(name, {"state": NOT_LOADED if self.enabled else DISABLED})
+
+    def get(self, name: str) -> Any:
+        """Returns the loaded model, loading it first if needed."""
+        if name in self._models:
+            return self._models[name]
+        if not self.enabled:
+            raise RuntimeError(f"Model '{name}' is disabled on this instance (ENABLE_ML_MODELS=0)")
+        if name not in self._loaders:
+            raise KeyError(f"Unknown model '{name}'")
+
+        with self._locks[name]:
+            if name in self._models:
+                return self._models[name]
+            self._states[name] = {"state": LOADING}
+            started = time.perf_counter()
+            print(f"⏳ Loading model '{name}'...")
+            try:
+                model = self._loaders[name]()
+            except Exception as e:
+                self._states[name] = {"state": FAILED, "error": str(e)}
+                raise
+            elapsed = time.perf_counter() - started
+            self._models[name] = model
+            self._states[name] = {"state": READY, "load_seconds": round(elapsed, 2)}
+            print(f"✅ Model '{name}' loaded in {elapsed:.1f}s")
+            return model
+
+    def status(self) -> Dict[str, dict]:
+        return {name: dict(state) for name, state in self._states.items()}
+
+    def warm_up(self):
+        """Loads every registered model; failures are recorded in status()."""
+        if not self.enabled:
+            return
+        for name in list(self._loaders):
+            try:
+                self.get(name)
+            except Exception:
+                traceback.print_exc()
+
+    def start_warm_up(self) -> threading.Thread:
+        thread = threading.Thread(target=self.warm_up, name="model-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+registry = ModelRegistry(enabled=ENABLE_ML_MODELS)
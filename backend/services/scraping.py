@@ -1,11 +1,14 @@
-import requests
+import asyncio
 from bs4 import BeautifulSoup
 from newspaper import Article
 from datetime import datetime
-from typing import Tuple, Optional
+from typing import Tuple, Optional, List
+from services.http_client import fetch, head_ok
+from services.extractors import get_extractor, SiteExtractor
 import re
 
-import re
+MAX_EXTRA_PAGES = 10  # Limit to 10 additional pages max
+MAX_PROBED_PAGE = 5  # Without pagination links, try up to page 5
 
 def calculate_text_similarity(text1: str, text2: str) -> float:
     """Calculate simple similarity ratio between two texts."""
@@ -22,23 +25,51 @@ def calculate_text_similarity(text1: str, text2: str) -> float:
     
     return intersection / union if union > 0 else 0.0
 
-def scrape_news(url: str) -> dict:
+def _parse_page(url: str, html: str) -> Tuple[Article, BeautifulSoup]:
+    """Parses one downloaded page with both newspaper3k and an lxml-backed soup."""
+    article = Article(url)
+    article.download(input_html=html)
+    article.parse()
+    soup = BeautifulSoup(html, "lxml")
+    return article, soup
+
+def _extract_page_content(url: str, html: str) -> Tuple[str, str]:
+    """Returns (content, method) for a pagination page, preferring newspaper3k's text."""
+    try:
+        article, soup = _parse_page(url, html)
+    except Exception:
+        article, soup = None, BeautifulSoup(html, "lxml")
+    
+    if article and article.text and len(article.text) > 100:
+        return article.text, "newspaper3k"
+    
+    # Fallback: paragraphs from the same soup
+    paragraphs = [p.get_text().strip() for p in soup.find_all("p")]
+    return " ".join([p for p in paragraphs if p and len(p) > 50]), "BeautifulSoup"
+
+async def scrape_news(url: str) -> dict:
     """
     Scrapes news article data from a given URL using newspaper3k and BeautifulSoup.
     Handles multi-page articles (pagination).
+    Pages are fetched with the shared async HTTP client and parsed in a worker
+    thread, so a slow site never blocks the event loop.
     """
     try:
-        # Use newspaper3k for high-level extraction
-        article = Article(url)
-        article.download()
-        article.parse()
+        page = await fetch(url)
+        if page.status_code != 200:
+            raise RuntimeError(f"HTTP {page.status_code}")
         
-        # Use BeautifulSoup for more granular control if needed (e.g., meta tags)
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36"
-        }
-        response = requests.get(url, headers=headers)
-        soup = BeautifulSoup(response.text, "html.parser")
+        # Known outlets: per-site selectors, no newspaper3k heuristics
+        extractor = get_extractor(url)
+        if extractor:
+            extracted = await asyncio.to_thread(extractor.extract, url, page.text)
+            if extracted:
+                return await _scrape_with_extractor(url, extractor, extracted, page.text)
+            print(f"ℹ️ {extractor.name} selectors found no article body, falling back to generic extraction")
+        
+        # newspaper3k for high-level extraction, BeautifulSoup (lxml) for meta tags,
+        # the <p> fallback and pagination links; both parse the same downloaded HTML
+        article, soup = await asyncio.to_thread(_parse_page, url, page.text)
         
         title = article.title or (soup.find("title").get_text() if soup.find("title") else "")
         
@@ -47,7 +78,7 @@ def scrape_news(url: str) -> dict:
         first_page_content = content  # Save for deduplication
         
         # Check for pagination and scrape additional pages
-        additional_content = scrape_paginated_content(url, soup, headers, first_page_content)
+        additional_content = await scrape_paginated_content(url, soup, first_page_content)
         if additional_content:
             print(f"✅ Found {len(additional_content)} chars of unique additional content")
             content += "\n\n" + additional_content
@@ -74,17 +105,37 @@ def scrape_news(url: str) -> dict:
             "published_at": published_at.isoformat() if published_at else None
         }
     except Exception as e:
-        # Log error or handle specific ones like requests.exceptions.RequestException
+        # Log error or handle specific ones like httpx.HTTPError or ResponseTooLarge
         raise RuntimeError(f"Failed to scrape article: {str(e)}") from e
 
-def scrape_paginated_content(base_url: str, first_page_soup: BeautifulSoup, headers: dict, first_page_content: str) -> str:
+async def _scrape_with_extractor(url: str, extractor: SiteExtractor, extracted: dict, html: str) -> dict:
+    print(f"🧩 Extracted with {extractor.name} selectors")
+    content = extracted["content"]
+    if extracted["page_links"]:
+        additional_content = await _collect_pages(extracted["page_links"], content, extractor)
+    else:
+        # No pagination selector matched: detect pages the generic way, still parsing them with the extractor
+        soup = await asyncio.to_thread(BeautifulSoup, html, "lxml")
+        additional_content = await scrape_paginated_content(url, soup, content, extractor)
+    if additional_content:
+        print(f"✅ Found {len(additional_content)} chars of unique additional content")
+        content += "\n\n" + additional_content
+    
+    published_at = extracted["published_at"]
+    return {
+        "title": extracted["title"],
+        "content": content,
+        "img_url": extracted["img_url"],
+        "published_at": published_at.isoformat() if published_at else None
+    }
+
+async def scrape_paginated_content(base_url: str, first_page_soup: BeautifulSoup, first_page_content: str,
+                                   extractor: Optional[SiteExtractor] = None) -> str:
     """
     Detects and scrapes content from paginated articles.
     Handles common pagination patterns used by Indonesian news sites.
     Uses similarity detection to avoid duplicating content.
     """
-    all_content = []
-    
     # Pattern 1: Look for pagination links (common in Sindo, Detik, etc.)
     # Examples: "?page=2", "/2", "-2.html", etc.
     pagination_links = []
@@ -142,80 +193,87 @@ def scrape_paginated_content(base_url: str, first_page_soup: BeautifulSoup, head
     # Pattern 2: Check for common pagination URL patterns
     # Sindo often uses: article-url?page=2, article-url/2, etc.
     if not pagination_links:
-        # Try constructing pagination URLs
-        for page_num in range(2, 6):  # Try up to 5 pages
-            potential_urls = [
-                f"{base_url}?page={page_num}",
-                f"{base_url}&page={page_num}",
-                f"{base_url}/{page_num}",
-                base_url.replace('.html', f'-{page_num}.html') if '.html' in base_url else None,
-            ]
-            
-            for potential_url in potential_urls:
-                if potential_url and potential_url not in pagination_links:
-                    # Quick check if this URL exists
-                    try:
-                        test_response = requests.head(potential_url, headers=headers, timeout=3)
-                        if test_response.status_code == 200:
-                            pagination_links.append(potential_url)
-                            break  # Found valid pattern, use it for remaining pages
-                    except:
-                        continue
+        pagination_links = await _probe_pagination_links(base_url)
     
     print(f"📄 Total pagination links to scrape: {len(pagination_links)}")
+    return await _collect_pages(pagination_links, first_page_content, extractor)
+
+async def _collect_pages(pagination_links: List[str], first_page_content: str, extractor: Optional[SiteExtractor] = None) -> str:
+    """
+    Fetches all additional pages concurrently (bounded per domain by the HTTP client),
+    then reassembles them in page order without near-duplicate pages.
+    """
+    all_content = []
+    page_urls = pagination_links[:MAX_EXTRA_PAGES]
+    page_contents = await asyncio.gather(*[
+        _fetch_page_content(idx, page_url, extractor) for idx, page_url in enumerate(page_urls, start=2)
+    ])
     
-    # Scrape content from additional pages
-    for idx, page_url in enumerate(pagination_links[:10], start=2):  # Limit to 10 additional pages max
-        try:
-            print(f"  📖 Scraping page {idx}: {page_url}")
-            
-            # Try using newspaper3k first for better content extraction
-            try:
-                page_article = Article(page_url)
-                page_article.download()
-                page_article.parse()
-                page_content = page_article.text
-                
-                if page_content and len(page_content) > 100:
-                    # Check if this content is significantly different from first page
-                    similarity = calculate_text_similarity(first_page_content, page_content)
-                    print(f"    📊 Similarity with page 1: {similarity:.2%}")
-                    
-                    if similarity < 0.85:  # Less than 85% similar = different content
-                        print(f"    ✅ Got {len(page_content)} chars via newspaper3k (unique)")
-                        all_content.append(page_content)
-                    else:
-                        print(f"    ⚠️ Skipping duplicate content (too similar to page 1)")
-                    continue
-            except:
-                pass  # Fall back to BeautifulSoup
-            
-            # Fallback: Use BeautifulSoup
-            page_response = requests.get(page_url, headers=headers, timeout=10)
-            if page_response.status_code == 200:
-                page_soup = BeautifulSoup(page_response.text, "html.parser")
-                
-                # Extract paragraphs from this page
-                paragraphs = page_soup.find_all("p")
-                page_content = " ".join([p.get_text().strip() for p in paragraphs if p.get_text().strip() and len(p.get_text().strip()) > 50])
-                
-                if page_content and len(page_content) > 100:  # Only add if substantial content
-                    # Check similarity
-                    similarity = calculate_text_similarity(first_page_content, page_content)
-                    print(f"    📊 Similarity with page 1: {similarity:.2%}")
-                    
-                    if similarity < 0.85:
-                        print(f"    ✅ Got {len(page_content)} chars via BeautifulSoup (unique)")
-                        all_content.append(page_content)
-                    else:
-                        print(f"    ⚠️ Skipping duplicate content")
-                else:
-                    print(f"    ⚠️ Content too short: {len(page_content)} chars")
-            else:
-                print(f"    ❌ HTTP {page_response.status_code}")
-        except Exception as e:
-            print(f"    ❌ Error scraping page {page_url}: {str(e)}")
+    for idx, page_content in enumerate(page_contents, start=2):
+        if not page_content:
             continue
+        # Check if this content is significantly different from page 1 and the pages already kept
+        similarity = max(calculate_text_similarity(seen, page_content) for seen in [first_page_content] + all_content)
+        print(f"    📊 Page {idx} similarity with earlier pages: {similarity:.2%}")
+        
+        if similarity < 0.85:  # Less than 85% similar = different content
+            all_content.append(page_content)
+        else:
+            print(f"    ⚠️ Skipping page {idx}: duplicate content (too similar to an earlier page)")
     
     print(f"📦 Total additional content collected: {len(all_content)} pages, {sum(len(c) for c in all_content)} chars")
     return "\n\n".join(all_content)
+
+def _candidate_page_urls(base_url: str, page_num: int) -> List[str]:
+    """Common pagination URL patterns, in order of preference."""
+    candidates = [
+        f"{base_url}?page={page_num}",
+        f"{base_url}&page={page_num}",
+        f"{base_url}/{page_num}",
+        base_url.replace('.html', f'-{page_num}.html') if '.html' in base_url else None,
+    ]
+    return [c for c in candidates if c]
+
+async def _probe_pagination_links(base_url: str) -> List[str]:
+    """
+    Probes every candidate pattern for page 2 at once and keeps the first one
+    (in preference order) that exists; pages 3+ reuse that pattern. A URL that
+    doesn't exist is simply skipped when the pages are fetched.
+    """
+    second_pages = _candidate_page_urls(base_url, 2)
+    probes = [asyncio.create_task(head_ok(url, timeout=3)) for url in second_pages]
+    try:
+        for pattern, probe in enumerate(probes):
+            # Awaiting in preference order stops at the first working pattern
+            if await probe:
+                print(f"🔍 Pagination pattern found: {second_pages[pattern]}")
+                return [_candidate_page_urls(base_url, n)[pattern] for n in range(2, MAX_PROBED_PAGE + 1)]
+    finally:
+        for probe in probes:
+            probe.cancel()
+    return []
+
+async def _fetch_page_content(idx: int, page_url: str, extractor: Optional[SiteExtractor] = None) -> str:
+    try:
+        print(f"  📖 Scraping page {idx}: {page_url}")
+        
+        # One fetch per page; newspaper3k and the soup fallback share the same HTML
+        page_response = await fetch(page_url)
+        if page_response.status_code != 200:
+            print(f"    ❌ Page {idx}: HTTP {page_response.status_code}")
+            return ""
+        
+        extracted = await asyncio.to_thread(extractor.extract, page_url, page_response.text) if extractor else None
+        if extracted:
+            page_content, method = extracted["content"], extractor.name
+        else:
+            page_content, method = await asyncio.to_thread(_extract_page_content, page_url, page_response.text)
+        if not page_content or len(page_content) <= 100:  # Only add if substantial content
+            print(f"    ⚠️ Page {idx}: content too short: {len(page_content)} chars")
+            return ""
+        
+        print(f"    ✅ Page {idx}: got {len(page_content)} chars via {method}")
+        return page_content
+    except Exception as e:
+        print(f"    ❌ Error scraping page {page_url}: {str(e)}")
+        return ""
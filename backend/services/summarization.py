@@ -1,57 +1,127 @@
 import os
 import asyncio
-import random
-from groq import Groq
+import hashlib
+import sqlite3
+from groq import AsyncGroq
 from dotenv import load_dotenv
 from db.supabase import supabase
-from typing import List, Dict
+from services.inference_cache import cache, content_hash, INFERENCE_CACHE_ENABLED
+from services.llm_scheduler import llm_scheduler, LLMUnavailable, LLM_MAX_RETRIES, LLM_TOKENS_PER_MIN
+from typing import List, Dict, Optional, Callable, AsyncIterator
 
 load_dotenv()
 
-# Configure Groq
+# Configure Groq (async client, so LLM calls never block the event loop).
+# Retries are left to the LLM scheduler; GROQ_BASE_URL can point at a local fake server.
 groq_api_key = os.getenv("GROQ_API_KEY")
-client = Groq(api_key=groq_api_key) if groq_api_key else None
+client = AsyncGroq(api_key=groq_api_key, max_retries=0) if groq_api_key else None
 
 # Default model for Groq
 DEFAULT_MODEL = "llama-3.3-70b-versatile"
+TEMPERATURE = 0.5
+MAX_COMPLETION_TOKENS = 1024
+
+# Completions are cached per prompt in the inference cache, so identical prompts never go to Groq twice
+LLM_CACHE_ENABLED = INFERENCE_CACHE_ENABLED and os.getenv("LLM_CACHE", "1") != "0"
+LLM_CACHE_MODEL_ID = f"{DEFAULT_MODEL}@{TEMPERATURE}"
+
+LABELS = ["oposisi", "netral", "pro_pemerintah"]
+
+# Rough chars-per-token ratio of Indonesian news text for the Llama tokenizer
+CHARS_PER_TOKEN = 3.5
+# Instructions and separators around the article text of a summary prompt, in (estimated) tokens
+SUMMARY_PROMPT_OVERHEAD = 500
+# Article text allowed in one summary prompt, in (estimated) tokens. Larger label groups
+# are summarized chunk by chunk first and the partial summaries merged afterwards.
+# A whole request (prompt + completion) must fit in the per-minute token limit, so the
+# budget defaults to, and is capped at, what LLM_TOKENS_PER_MIN leaves for the articles.
+MAX_SUMMARY_TOKEN_BUDGET = int(LLM_TOKENS_PER_MIN) - MAX_COMPLETION_TOKENS - SUMMARY_PROMPT_OVERHEAD
+if MAX_SUMMARY_TOKEN_BUDGET <= 0:
+    raise ValueError(
+        f"LLM_TOKENS_PER_MIN={LLM_TOKENS_PER_MIN:g} cannot fit a summary request "
+        f"({MAX_COMPLETION_TOKENS} completion + {SUMMARY_PROMPT_OVERHEAD} prompt tokens)"
+    )
+SUMMARY_TOKEN_BUDGET = int(os.getenv("SUMMARY_TOKEN_BUDGET", MAX_SUMMARY_TOKEN_BUDGET))
+if SUMMARY_TOKEN_BUDGET > MAX_SUMMARY_TOKEN_BUDGET:
+    print(f"⚠️ SUMMARY_TOKEN_BUDGET={SUMMARY_TOKEN_BUDGET} does not fit LLM_TOKENS_PER_MIN, using {MAX_SUMMARY_TOKEN_BUDGET}")
+    SUMMARY_TOKEN_BUDGET = MAX_SUMMARY_TOKEN_BUDGET
+# Partial-summary rounds before the remaining text is cut to the budget
+MAX_REDUCE_ROUNDS = 3
+
+def _cached_completion(prompt: str) -> Optional[str]:
+    if not LLM_CACHE_ENABLED:
+        return None
+    try:
+        value = cache.get_many("llm", LLM_CACHE_MODEL_ID, [prompt])[0]
+    except sqlite3.Error as e:
+        print(f"⚠️ LLM cache read failed: {e}")
+        return None
+    return value.decode("utf-8") if value is not None else None
+
+def _store_completion(prompt: str, text: str):
+    if not LLM_CACHE_ENABLED or not text:
+        return
+    try:
+        cache.put_many("llm", LLM_CACHE_MODEL_ID, [prompt], [text.encode("utf-8")])
+    except sqlite3.Error as e:
+        print(f"⚠️ LLM cache write failed: {e}")
+
+async def call_groq_with_retry(prompt: str, retries: int = LLM_MAX_RETRIES, on_token: Optional[Callable[[str], None]] = None) -> str:
+    """
+    Calls Groq through the shared LLM scheduler, which owns rate limiting, 429 /
+    Retry-After handling, retries and the circuit breaker (see services/llm_scheduler.py).
+    With `on_token` the completion is streamed and every text delta is passed to it
+    as it arrives (cached completions arrive as a single delta).
+    """
+    cached = _cached_completion(prompt)
+    if cached is not None:
+        if on_token:
+            on_token(cached)
+        return cached
 
-async def call_groq_with_retry(prompt: str, retries: int = 3, initial_delay: int = 2) -> str:
-    """Helper to call Groq with exponential backoff for rate limits (429)."""
     if not client:
         print("❌ Groq client not configured (missing GROQ_API_KEY)")
         return ""
-        
-    delay = initial_delay
-    for attempt in range(retries):
-        try:
-            # Groq SDK handles sync by default, we wrap it for async compatibility if needed
-            # but here we can just call it (Groq doesn't have a native async library like Gemini yet, 
-            # so we run it in a thread pool for safety in a real async app, but for now simple call)
-            completion = client.chat.completions.create(
+
+    messages = [
+        {"role": "system", "content": "Anda adalah asisten AI yang ahli dalam analisis berita di Indonesia."},
+        {"role": "user", "content": prompt}
+    ]
+
+    async def request() -> str:
+        if on_token is None:
+            completion = await client.chat.completions.create(
                 model=DEFAULT_MODEL,
-                messages=[
-                    {"role": "system", "content": "Anda adalah asisten AI yang ahli dalam analisis berita di Indonesia."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.5,
-                max_tokens=1024,
+                messages=messages,
+                temperature=TEMPERATURE,
+                max_tokens=MAX_COMPLETION_TOKENS,
             )
-            return completion.choices[0].message.content.strip()
-        except Exception as e:
-            error_str = str(e)
-            if "429" in error_str or "rate limit" in error_str.lower():
-                if attempt < retries - 1:
-                    wait_time = delay + random.uniform(0, 1)
-                    print(f"⚠️ Groq Rate limit hit. Retrying in {wait_time:.2f}s (Attempt {attempt + 1}/{retries})")
-                    await asyncio.sleep(wait_time)
-                    delay *= 2
-                else:
-                    print(f"❌ Max retries reached for Groq: {e}")
-                    raise e
-            else:
-                print(f"❌ Groq error: {e}")
-                raise e
-    return ""
+            return completion.choices[0].message.content
+        stream = await client.chat.completions.create(
+            model=DEFAULT_MODEL,
+            messages=messages,
+            temperature=TEMPERATURE,
+            max_tokens=MAX_COMPLETION_TOKENS,
+            stream=True,
+        )
+        parts = []
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                parts.append(delta)
+                on_token(delta)
+        return "".join(parts)
+
+    try:
+        text = await llm_scheduler.run(request, estimate_tokens(prompt) + MAX_COMPLETION_TOKENS, retries)
+    except LLMUnavailable:
+        raise
+    except Exception as e:
+        print(f"❌ Groq error: {e}")
+        raise e
+    text = text.strip()
+    _store_completion(prompt, text)
+    return text
 
 async def generate_issue_title_ai(contents: List[str]) -> str:
     """Generates a concise and neutral issue title based on all news contents."""
@@ -78,15 +148,84 @@ async def generate_issue_title_ai(contents: List[str]) -> str:
             if title.lower().startswith("judul:"):
                 title = title[6:].strip()
         return title
+    except LLMUnavailable:
+        raise
     except Exception as e:
         print(f"Title generation error: {str(e)}")
         return ""
 
-async def generate_label_summary(contents: List[str], label: str) -> str:
+def estimate_tokens(text: str) -> int:
+    return int(len(text) / CHARS_PER_TOKEN) + 1
+
+def _truncate_to_tokens(text: str, tokens: int) -> str:
+    return text[:int(tokens * CHARS_PER_TOKEN)]
+
+def pack_chunks(contents: List[str], budget: int) -> List[List[str]]:
+    """Groups contents, in order, into chunks of at most `budget` estimated tokens each."""
+    chunks, current, used = [], [], 0
+    for text in contents:
+        text = _truncate_to_tokens(text, budget)
+        tokens = estimate_tokens(text)
+        if current and used + tokens > budget:
+            chunks.append(current)
+            current, used = [], 0
+        current.append(text)
+        used += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+async def summarize_chunk(contents: List[str], label: str) -> str:
+    """Map step: condenses one chunk of a large label group into its key points."""
+    combined_text = "\n---\n".join(contents)
+    prompt = f"""
+    Berikut adalah sebagian dari kumpulan konten berita dengan label: {label.upper()}.
+    
+    Tugas Anda:
+    Catat semua fakta, klaim, tokoh, angka, dan sudut pandang penting dari konten ini secara ringkas.
+    Format: satu kalimat per baris, tanpa tanda bullet, tanpa kalimat pembuka atau penutup.
+    Gunakan Bahasa Indonesia yang baku dan objektif.
+
+    KONTEN BERITA:
+    {combined_text}
+    """
+    
+    try:
+        return await call_groq_with_retry(prompt)
+    except LLMUnavailable:
+        raise
+    except Exception as e:
+        print(f"Chunk summarization error ({label}): {str(e)}")
+        return ""
+
+async def reduce_to_budget(contents: List[str], label: str, budget: int = SUMMARY_TOKEN_BUDGET) -> List[str]:
+    """
+    Map-reduce for label groups larger than the token budget: chunks are summarized in
+    parallel and the partial summaries replace the articles, until everything fits in
+    one prompt. Prompt size stays bounded and latency grows with the number of rounds,
+    not with the number of articles.
+    """
+    for _ in range(MAX_REDUCE_ROUNDS):
+        if sum(estimate_tokens(c) for c in contents) <= budget:
+            return contents
+        chunks = pack_chunks(contents, budget)
+        print(f"🧩 {label}: {len(contents)} texts over the {budget}-token budget, summarizing {len(chunks)} chunks")
+        partials = await asyncio.gather(*[summarize_chunk(chunk, label) for chunk in chunks])
+        # A failed chunk keeps its own articles, cut to the size of a partial summary, so one
+        # LLM error neither drops those articles nor stops the other chunks from shrinking
+        contents = [
+            partial or _truncate_to_tokens("\n".join(chunk), MAX_COMPLETION_TOKENS)
+            for partial, chunk in zip(partials, chunks)
+        ]
+    # Still too large (e.g. a tiny budget): keep what fits
+    return pack_chunks(contents, budget)[0]
+
+async def generate_label_summary(contents: List[str], label: str, on_token: Optional[Callable[[str], None]] = None) -> str:
     """Uses Groq to summarize news contents of a specific label."""
     if not contents:
         return ""
     
+    contents = await reduce_to_budget(contents, label)
     combined_text = "\n---\n".join(contents)
     prompt = f"""
     Berikut adalah kumpulan konten berita dengan label: {label.upper()}.
@@ -104,13 +243,15 @@ async def generate_label_summary(contents: List[str], label: str) -> str:
     """
     
     try:
-        summary = await call_groq_with_retry(prompt)
+        summary = await call_groq_with_retry(prompt, on_token=on_token)
         return summary
+    except LLMUnavailable:
+        raise
     except Exception as e:
         print(f"Summarization error ({label}): {str(e)}")
         return ""
 
-async def generate_bias_comparison(summaries: Dict[str, str]) -> str:
+async def generate_bias_comparison(summaries: Dict[str, str], on_token: Optional[Callable[[str], None]] = None) -> str:
     """Groq logic to create a bias comparison based on label summaries."""
     # Build sections only for labels that have data
     sections = []
@@ -151,66 +292,189 @@ async def generate_bias_comparison(summaries: Dict[str, str]) -> str:
     """
     
     try:
-        comparison = await call_groq_with_retry(prompt)
+        comparison = await call_groq_with_retry(prompt, on_token=on_token)
         return comparison
+    except LLMUnavailable:
+        raise
     except Exception as e:
         print(f"Comparison error: {str(e)}")
         return ""
 
-async def process_issue_summarization(issue_id: int):
-    """Orchestrates the whole summarization process for an issue."""
-    # Fetch issue details first to check for existing title
-    issue_res = supabase.table("issues").select("title").eq("id", issue_id).single().execute()
-    current_title = issue_res.data.get("title") if issue_res.data else ""
+def representative_news(news_items: List[dict]) -> List[dict]:
+    """
+    Keeps one article per near-duplicate group (see services/duplicate_index.py) so
+    republished wire stories are only sent to the LLM once. Originals win over copies.
+    """
+    seen = set()
+    representatives = []
+    for news in sorted(news_items, key=lambda n: n.get("duplicate_of") is not None):
+        group = news.get("duplicate_of") or news.get("id")
+        if group in seen:
+            continue
+        seen.add(group)
+        representatives.append(news)
+    return representatives
+
+def label_fingerprints(grouped_news: Dict[str, List[dict]]) -> Dict[str, str]:
+    """Hash of the (news_id, label, content hash) set of every label group."""
+    fingerprints = {}
+    for label, news_items in grouped_news.items():
+        members = sorted(f"{news['id']}:{label}:{content_hash(news['content'] or '')}" for news in news_items)
+        fingerprints[label] = hashlib.sha256("\n".join(members).encode("utf-8")).hexdigest()
+    return fingerprints
+
+async def _drain(events: asyncio.Queue, future: asyncio.Future) -> AsyncIterator[dict]:
+    """Yields queued events while `future` runs, then whatever is left once it is done."""
+    while not future.done():
+        getter = asyncio.ensure_future(events.get())
+        try:
+            await asyncio.wait({getter, future}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            received = getter.done()
+            if not received:
+                # An item that arrives meanwhile stays in the queue for the final flush
+                getter.cancel()
+        if received:
+            yield getter.result()
+    while not events.empty():
+        yield events.get_nowait()
+    future.result()
+
+async def summarize_issue_events(issue_id: int, stream_tokens: bool = False) -> AsyncIterator[dict]:
+    """
+    Orchestrates the whole summarization process for an issue as a stream of events:
+    `summary` per label, `comparison`, `title` as each finishes (plus `token` deltas with
+    stream_tokens=True), and finally `done` carrying the data written to the issue.
+    Yields nothing if the issue has no news.
+    
+    Only label groups whose articles changed since the last run (see label_fingerprints)
+    are summarized again, and the comparison only reruns when a summary changed.
+    The issue row is written once, at the end.
+    """
+    # Fetch the current summaries and fingerprints first, plus the title to decide on an AI title
+    issue_res = supabase.table("issues") \
+        .select("title, summarize_oposisi, summarize_netral, summarize_pro_pemerintah, summarize_all, summary_fingerprints") \
+        .eq("id", issue_id) \
+        .single() \
+        .execute()
+    issue = issue_res.data or {}
+    current_title = issue.get("title") or ""
     
     res = supabase.table("news_issues") \
-        .select("news(content, label)") \
+        .select("news(id, content, label, duplicate_of)") \
         .eq("issue_id", issue_id) \
         .execute()
     
     if not res.data:
-        return None
+        return
     
-    grouped_contents = {
-        "oposisi": [],
-        "netral": [],
-        "pro_pemerintah": []
-    }
+    entries = representative_news([entry["news"] for entry in res.data if entry.get("news")])
     
-    for entry in res.data:
-        news = entry["news"]
+    grouped_news = {label: [] for label in LABELS}
+    for news in entries:
         label = news.get("label")
-        if label in grouped_contents:
-            grouped_contents[label].append(news["content"])
+        if label in grouped_news:
+            grouped_news[label].append(news)
+    grouped_contents = {label: [news["content"] for news in items] for label, items in grouped_news.items()}
+    
+    fingerprints = label_fingerprints(grouped_news)
+    previous_fingerprints = issue.get("summary_fingerprints") or {}
+    previous_summaries = {label: issue.get(f"summarize_{label}") or "" for label in LABELS}
+    changed_labels = [
+        label for label in LABELS
+        if fingerprints[label] != previous_fingerprints.get(label)
+        or (grouped_contents[label] and not previous_summaries[label])
+    ]
+    for label in LABELS:
+        if label not in changed_labels:
+            yield {"event": "summary", "label": label, "text": previous_summaries[label], "cached": True}
+    
+    events: asyncio.Queue = asyncio.Queue()
+    
+    def token_sink(section: str) -> Optional[Callable[[str], None]]:
+        if not stream_tokens:
+            return None
+        return lambda delta: events.put_nowait({"event": "token", "section": section, "delta": delta})
+    
+    async def summarize_label(label: str) -> str:
+        text = await generate_label_summary(grouped_contents[label], label, on_token=token_sink(label))
+        events.put_nowait({"event": "summary", "label": label, "text": text, "cached": False})
+        return text
+    
+    async def generate_title() -> str:
+        all_content_list = []
+        for contents in grouped_contents.values():
+            all_content_list.extend(contents)
+        title = await generate_issue_title_ai(all_content_list)
+        events.put_nowait({"event": "title", "text": title})
+        return title
+    
+    # Only generate AI title if current title is empty or is the generic "Isu: ..." fallback
+    # This preserves titles already generated by AI or edited by the admin.
+    needs_title = not current_title or current_title.startswith("Isu: ")
+    
+    # The label summaries and the title are independent, so they run concurrently;
+    # only the comparison has to wait for the summaries.
+    title_task = asyncio.ensure_future(generate_title()) if needs_title else None
+    label_results = asyncio.gather(*[summarize_label(label) for label in changed_labels])
+    tasks = [label_results] + ([title_task] if title_task else [])
     
-    summaries = {}
-    for label, contents in grouped_contents.items():
-        if contents:
-            summaries[label] = await generate_label_summary(contents, label)
+    try:
+        async for event in _drain(events, label_results):
+            yield event
+        summaries = dict(previous_summaries)
+        summaries.update(zip(changed_labels, label_results.result()))
+        changed_summaries = [label for label in LABELS if summaries[label] != previous_summaries[label]]
+        
+        summarize_all = issue.get("summarize_all") or ""
+        if changed_summaries or not summarize_all:
+            comparison = asyncio.ensure_future(generate_bias_comparison(summaries, on_token=token_sink("all")))
+            tasks.append(comparison)
+            async for event in _drain(events, comparison):
+                yield event
+            summarize_all = comparison.result()
         else:
-            summaries[label] = ""
-            
-    summarize_all = await generate_bias_comparison(summaries)
+            print(f"♻️ Issue {issue_id}: article set unchanged, keeping the existing summaries")
+        yield {"event": "comparison", "text": summarize_all}
+        
+        ai_title = ""
+        if title_task:
+            async for event in _drain(events, title_task):
+                yield event
+            ai_title = title_task.result()
+    finally:
+        # Open circuit, failure or a client that went away: stop the remaining LLM calls
+        # and keep the stored summaries rather than overwriting them with partial ones
+        for task in tasks:
+            if not task.done():
+                task.cancel()
     
     update_data = {
         "summarize_oposisi": summaries.get("oposisi"),
         "summarize_netral": summaries.get("netral"),
         "summarize_pro_pemerintah": summaries.get("pro_pemerintah"),
         "summarize_all": summarize_all,
+        "summary_fingerprints": fingerprints,
         "timemodified": "now()"
     }
+    if ai_title:
+        update_data["title"] = ai_title
     
-    # Only generate AI title if current title is empty or is the generic "Isu: ..." fallback
-    # This preserves titles already generated by AI or edited by the admin.
-    if not current_title or current_title.startswith("Isu: "):
-        all_content_list = []
-        for contents in grouped_contents.values():
-            all_content_list.extend(contents)
-        
-        ai_title = await generate_issue_title_ai(all_content_list)
-        if ai_title:
-            update_data["title"] = ai_title
-    
-    supabase.table("issues").update(update_data).eq("id", issue_id).execute()
+    unchanged = (
+        not changed_summaries
+        and summarize_all == issue.get("summarize_all")
+        and fingerprints == previous_fingerprints
+        and "title" not in update_data
+    )
+    if not unchanged:
+        supabase.table("issues").update(update_data).eq("id", issue_id).execute()
     
-    return update_data
+    yield {"event": "done", "data": update_data}
+
+async def process_issue_summarization(issue_id: int):
+    """Summarizes an issue (see summarize_issue_events) and returns the data written to it."""
+    result = None
+    async for event in summarize_issue_events(issue_id):
+        if event["event"] == "done":
+            result = event["data"]
+    return result
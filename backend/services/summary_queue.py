@@ -0,0 +1,307 @@
+"""
+Background queue for issue summarization.
+
+Callers submit the issue ids they touched and get a job id back straight away.
+Submissions for the same issue are coalesced within SUMMARY_DEBOUNCE_SECONDS, so
+overlapping clustering batches summarize an issue once with the latest articles;
+an issue is never summarized by two workers at the same time.
+
+Jobs, pending issues and claims live in one SQLite file (SUMMARY_QUEUE_PATH) shared
+by every API worker on the host, so with uvicorn --workers N any worker answers
+/jobs/{id}, debouncing works across workers and each issue is claimed by one of them.
+Issues claimed by a process that has died are picked up again: re-run with
+SUMMARY_QUEUE_DURABLE=1, otherwise marked failed.
+"""
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import asyncio
+import threading
+import traceback
+from typing import Dict, List, Optional, Tuple
+from services.summarization import process_issue_summarization
+
+SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", 2))
+SUMMARY_DEBOUNCE_SECONDS = float(os.getenv("SUMMARY_DEBOUNCE_SECONDS", 5))
+# A steady stream of submissions can postpone an issue by at most this many debounce windows
+MAX_DEBOUNCE_WINDOWS = 3
+SUMMARY_QUEUE_DURABLE = os.getenv("SUMMARY_QUEUE_DURABLE", "0") == "1"
+SUMMARY_QUEUE_PATH = os.getenv(
+    "SUMMARY_QUEUE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), ".model_cache", "summary_queue.sqlite3"),
+)
+# How often a worker looks for issues submitted through another worker
+SUMMARY_POLL_INTERVAL = float(os.getenv("SUMMARY_POLL_INTERVAL", 1))
+# Claims older than this are taken over even if their process looks alive (pid reuse, hangs)
+SUMMARY_CLAIM_TIMEOUT = float(os.getenv("SUMMARY_CLAIM_TIMEOUT", 1800))
+# Finished jobs kept for the status endpoints
+JOB_HISTORY = 500
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+def _owner_alive(owner: str) -> bool:
+    """Owners are "host:pid:instance"; a process on another host is assumed alive."""
+    host, pid, _ = owner.split(":", 2)
+    if host != socket.gethostname():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, ValueError):
+        return True
+    return True
+
+class QueueStore:
+    """Jobs, debounced pending issues and running claims in SQLite, shared between processes."""
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, data TEXT NOT NULL, created_at REAL NOT NULL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pending (issue_id INTEGER PRIMARY KEY, due REAL NOT NULL, "
+            "first REAL NOT NULL, jobs TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS running (issue_id INTEGER PRIMARY KEY, owner TEXT NOT NULL, "
+            "jobs TEXT NOT NULL, claimed_at REAL NOT NULL)"
+        )
+        self._lock = threading.Lock()
+
+    def _transaction(self, fn, *args):
+        # BEGIN IMMEDIATE takes the write lock up front, so read-modify-write cycles
+        # from several processes never interleave
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(*args)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    def _enqueue(self, issue_id: int, job_ids: List[str], delay: float, now: float):
+        row = self._conn.execute("SELECT due, first, jobs FROM pending WHERE issue_id = ?", (issue_id,)).fetchone()
+        if row is None:
+            self._conn.execute(
+                "INSERT INTO pending VALUES (?, ?, ?, ?)", (issue_id, now + delay, now, json.dumps(sorted(job_ids)))
+            )
+            return
+        due, first, jobs = row
+        # Trailing debounce, capped so the issue is not postponed forever
+        due = min(now + delay, first + delay * MAX_DEBOUNCE_WINDOWS)
+        jobs = sorted(set(json.loads(jobs)) | set(job_ids))
+        self._conn.execute("UPDATE pending SET due = ?, jobs = ? WHERE issue_id = ?", (due, json.dumps(jobs), issue_id))
+
+    def add_job(self, job: dict, delay: float):
+        def add():
+            self._conn.execute(
+                "INSERT INTO jobs (id, data, created_at) VALUES (?, ?, ?)", (job["id"], json.dumps(job), job["created_at"])
+            )
+            now = time.time()
+            for issue_id in job["issues"]:
+                self._enqueue(int(issue_id), [job["id"]], delay, now)
+        self._transaction(add)
+
+    def claim_due(self, owner: str, limit: int) -> List[Tuple[int, List[str]]]:
+        """Moves up to `limit` due issues that nobody is running to `running`, owned by `owner`."""
+        def claim():
+            now = time.time()
+            rows = self._conn.execute(
+                "SELECT issue_id, jobs FROM pending WHERE due <= ? AND issue_id NOT IN (SELECT issue_id FROM running) "
+                "ORDER BY due LIMIT ?", (now, limit)
+            ).fetchall()
+            for issue_id, jobs in rows:
+                self._conn.execute("DELETE FROM pending WHERE issue_id = ?", (issue_id,))
+                self._conn.execute("INSERT INTO running VALUES (?, ?, ?, ?)", (issue_id, owner, jobs, now))
+            return [(issue_id, json.loads(jobs)) for issue_id, jobs in rows]
+        if limit <= 0:
+            return []
+        return self._transaction(claim)
+
+    def next_due(self) -> Optional[float]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(due) FROM pending WHERE issue_id NOT IN (SELECT issue_id FROM running)"
+            ).fetchone()
+        return row[0]
+
+    def _set_issue_state(self, job_ids: List[str], issue_id: int, state: dict):
+        for job_id in job_ids:
+            row = self._conn.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                continue
+            job = json.loads(row[0])
+            job["issues"][str(issue_id)] = state
+            statuses = [s["status"] for s in job["issues"].values()]
+            if all(s in (DONE, FAILED) for s in statuses):
+                job["status"] = FAILED if FAILED in statuses else DONE
+                job["finished_at"] = time.time()
+            else:
+                job["status"] = RUNNING
+            self._conn.execute("UPDATE jobs SET data = ? WHERE id = ?", (json.dumps(job), job_id))
+
+    def update_jobs(self, issue_id: int, job_ids: List[str], state: dict):
+        self._transaction(self._set_issue_state, job_ids, issue_id, state)
+
+    def finish(self, issue_id: int, job_ids: List[str], owner: str, state: dict):
+        def finish():
+            self._conn.execute("DELETE FROM running WHERE issue_id = ? AND owner = ?", (issue_id, owner))
+            self._set_issue_state(job_ids, issue_id, state)
+            self._trim()
+        self._transaction(finish)
+
+    def recover(self, resume: bool) -> int:
+        """Releases claims of dead (or timed out) owners: re-queued when `resume`, else marked failed."""
+        def recover():
+            now = time.time()
+            stale = [
+                (issue_id, owner, json.loads(jobs))
+                for issue_id, owner, jobs, claimed_at in self._conn.execute("SELECT issue_id, owner, jobs, claimed_at FROM running")
+                if now - claimed_at > SUMMARY_CLAIM_TIMEOUT or not _owner_alive(owner)
+            ]
+            for issue_id, owner, job_ids in stale:
+                self._conn.execute("DELETE FROM running WHERE issue_id = ? AND owner = ?", (issue_id, owner))
+                if resume:
+                    self._enqueue(issue_id, job_ids, 0, now)
+                    self._set_issue_state(job_ids, issue_id, {"status": QUEUED})
+                else:
+                    self._set_issue_state(job_ids, issue_id, {"status": FAILED, "error": "interrupted by a restart"})
+            return len(stale)
+        return self._transaction(recover)
+
+    def _trim(self):
+        self._conn.execute(
+            "DELETE FROM jobs WHERE id IN (SELECT id FROM jobs WHERE json_extract(data, '$.status') IN (?, ?) "
+            "ORDER BY created_at DESC LIMIT -1 OFFSET ?)", (DONE, FAILED, JOB_HISTORY)
+        )
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def recent(self, limit: int) -> List[dict]:
+        with self._lock:
+            rows = self._conn.execute("SELECT data FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [json.loads(data) for data, in rows]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            pending = self._conn.execute("SELECT COUNT(*) FROM pending").fetchone()[0]
+            running = self._conn.execute("SELECT COUNT(*) FROM running").fetchone()[0]
+            open_jobs = self._conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE json_extract(data, '$.status') NOT IN (?, ?)", (DONE, FAILED)
+            ).fetchone()[0]
+        return {"pending_issues": pending, "running_issues": running, "open_jobs": open_jobs}
+
+class SummaryQueue:
+    def __init__(self, workers: int, debounce: float, store: QueueStore, resume: bool):
+        self.workers = workers
+        self.debounce = debounce
+        self.store = store
+        self.resume = resume
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._ready: Optional[asyncio.Queue] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        # Issues claimed by this process and not finished yet
+        self._claimed = 0
+
+    def start(self):
+        """Starts the scheduler and workers on the running loop (idempotent)."""
+        if self._tasks:
+            return
+        self._ready = asyncio.Queue()
+        self._wakeup = asyncio.Event()
+        # Claims left behind by a process that stopped
+        recovered = self.store.recover(self.resume)
+        if recovered:
+            print(f"♻️ Summary queue: {'resumed' if self.resume else 'failed'} {recovered} interrupted issue(s)")
+        self._tasks = [asyncio.create_task(self._schedule())]
+        self._tasks += [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, issue_ids: List[int]) -> dict:
+        """Queues summarization of the given issues and returns the new job."""
+        self.start()
+        job = {
+            "id": uuid.uuid4().hex,
+            "status": QUEUED,
+            "issues": {str(i): {"status": QUEUED} for i in issue_ids},
+            "created_at": time.time(),
+            "finished_at": None,
+        }
+        if not issue_ids:
+            job["status"] = DONE
+            job["finished_at"] = job["created_at"]
+        self.store.add_job(job, self.debounce)
+        self._wakeup.set()
+        return job
+
+    def get_job(self, job_id: str) -> Optional[dict]:
+        return self.store.get(job_id)
+
+    def recent_jobs(self, limit: int) -> List[dict]:
+        return self.store.recent(limit)
+
+    def stats(self) -> dict:
+        return {"workers": self.workers, "claimed_here": self._claimed, **self.store.counts()}
+
+    async def _schedule(self):
+        while True:
+            try:
+                claimed = await asyncio.to_thread(self.store.claim_due, self.owner, self.workers - self._claimed)
+                for issue_id, job_ids in claimed:
+                    self._claimed += 1
+                    self._ready.put_nowait((issue_id, job_ids))
+                due = await asyncio.to_thread(self.store.next_due)
+            except sqlite3.Error:
+                traceback.print_exc()
+                due = None
+            # Other workers submit into the same store, so never sleep longer than the poll interval
+            timeout = SUMMARY_POLL_INTERVAL if due is None else min(max(0.0, due - time.time()), SUMMARY_POLL_INTERVAL)
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _work(self):
+        while True:
+            issue_id, job_ids = await self._ready.get()
+            try:
+                await asyncio.to_thread(self.store.update_jobs, issue_id, job_ids, {"status": RUNNING})
+                started = time.perf_counter()
+                try:
+                    result = await process_issue_summarization(issue_id)
+                    state = {"status": DONE, "title": (result or {}).get("title")}
+                except Exception as e:
+                    traceback.print_exc()
+                    state = {"status": FAILED, "error": str(e)}
+                state["elapsed_ms"] = round((time.perf_counter() - started) * 1000)
+                await asyncio.to_thread(self.store.finish, issue_id, job_ids, self.owner, state)
+            except sqlite3.Error:
+                traceback.print_exc()
+            finally:
+                self._claimed -= 1
+                # A resubmission that arrived meanwhile may be due now
+                self._wakeup.set()
+
+summary_queue = SummaryQueue(
+    SUMMARY_WORKERS,
+    SUMMARY_DEBOUNCE_SECONDS,
+    QueueStore(SUMMARY_QUEUE_PATH),
+    resume=SUMMARY_QUEUE_DURABLE,
+)
@@ -0,0 +1,73 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional
+from db.supabase import supabase
+from utils.url_utils import canonicalize_url, page_base_url
+
+URL_INDEX_MAX_ENTRIES = int(os.getenv("URL_INDEX_MAX_ENTRIES", 50000))
+
+class UrlIndex:
+    """
+    Canonical URL -> news id lookup used to short-circuit ingestion of articles we
+    already have. Recently seen URLs are answered from an in-process LRU; misses
+    fall back to one query on the unique `news.canonical_url` column.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._lru: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def remember(self, canonical_url: str, news_id: int):
+        if not canonical_url:
+            return
+        with self._lock:
+            self._lru[canonical_url] = news_id
+            self._lru.move_to_end(canonical_url)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+
+    def forget(self, news_id):
+        """Drops a deleted article so its URL can be ingested again."""
+        with self._lock:
+            for url in [u for u, i in self._lru.items() if str(i) == str(news_id)]:
+                del self._lru[url]
+
+    def lookup_many(self, urls: Iterable[str]) -> Dict[str, int]:
+        """
+        Returns {original url: existing news id} for every URL that is already stored.
+        A pagination URL (".../slug/2", "...-2.html", "?page=2") also matches the stored
+        article of its first page; see utils.url_utils.page_base_url.
+        """
+        canonical = {url: canonicalize_url(url) for url in urls}
+        bases = {key: page_base_url(key) for key in set(canonical.values()) if key}
+        found: Dict[str, int] = {}
+        missing = set()
+        with self._lock:
+            for key in set(bases) | {b for b in bases.values() if b}:
+                if key in self._lru:
+                    self._lru.move_to_end(key)
+                    found[key] = self._lru[key]
+                else:
+                    missing.add(key)
+
+        if missing:
+            res = supabase.table("news").select("id, canonical_url").in_("canonical_url", list(missing)).execute()
+            for row in res.data or []:
+                found[row["canonical_url"]] = row["id"]
+                self.remember(row["canonical_url"], row["id"])
+
+        matches = {}
+        for url, key in canonical.items():
+            news_id = found.get(key)
+            if news_id is None and bases.get(key):
+                news_id = found.get(bases[key])
+            if news_id is not None:
+                matches[url] = news_id
+        return matches
+
+    def lookup(self, url: str) -> Optional[int]:
+        return self.lookup_many([url]).get(url)
+
+url_index = UrlIndex(URL_INDEX_MAX_ENTRIES)
@@ -0,0 +1,35 @@
+import os
+import base64
+import numpy as np
+from typing import Optional, Union, List
+
+# "json" keeps the plain vector columns only; "f16" / "f32" also write the compact
+# base64 columns (news.embedding_compact, issues.centroid_compact) and read from them.
+EMBEDDING_FORMAT = os.getenv("EMBEDDING_FORMAT", "json").lower()
+
+_DTYPES = {"f16": np.dtype("<f2"), "f32": np.dtype("<f4")}
+
+def compact_enabled() -> bool:
+    return EMBEDDING_FORMAT in _DTYPES
+
+def is_compact(value) -> bool:
+    return isinstance(value, str) and value[:4] in ("f16:", "f32:")
+
+def encode_embedding(vector: Union[List[float], np.ndarray], fmt: Optional[str] = None) -> str:
+    """Encodes a vector as '<fmt>:<base64 little-endian bytes>', e.g. 'f16:AAA...'."""
+    fmt = fmt or EMBEDDING_FORMAT
+    if fmt not in _DTYPES:
+        raise ValueError(f"Unknown compact embedding format: {fmt}")
+    data = np.asarray(vector, dtype=_DTYPES[fmt]).tobytes()
+    return f"{fmt}:{base64.b64encode(data).decode('ascii')}"
+
+def decode_embedding(value: str) -> np.ndarray:
+    """
+    Decodes a compact embedding straight from its bytes with np.frombuffer.
+    float32 payloads are returned without a copy (read-only); float16 is widened to float32.
+    """
+    fmt, payload = value.split(":", 1)
+    vector = np.frombuffer(base64.b64decode(payload), dtype=_DTYPES[fmt])
+    if vector.dtype != np.float32:
+        vector = vector.astype(np.float32)
+    return vector
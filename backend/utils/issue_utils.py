@@ -1,5 +1,11 @@
 from typing import List
 
+# Explicit issue columns for listings, so centroid embeddings are never shipped to clients
+ISSUE_COLUMNS = "id, title, summarize_oposisi, summarize_netral, summarize_pro_pemerintah, summarize_all, news_count, view_count, created_at, timemodified"
+
+# Same for news rows: everything except the stored embeddings
+NEWS_COLUMNS = "id, link_article, title, img_url, content, source, published_at, label, created_at"
+
 def inject_representative_image(issues_list: List[dict]):
     """Helper to inject representative_image and label counts into a list of issues."""
     for issue in issues_list:
@@ -0,0 +1,56 @@
+import re
+import base64
+import hashlib
+import numpy as np
+from typing import Optional
+
+# Word n-grams that make up the shingle set of a text
+SHINGLE_SIZE = 3
+NUM_PERMUTATIONS = 128
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+_PRIME = np.uint64((1 << 31) - 1)
+# Fixed seed: signatures stored in the database must stay comparable across restarts
+_rng = np.random.RandomState(20240601)
+_A = _rng.randint(1, int(_PRIME), size=NUM_PERMUTATIONS).astype(np.uint64)
+_B = _rng.randint(0, int(_PRIME), size=NUM_PERMUTATIONS).astype(np.uint64)
+
+def _shingle_hashes(text: str) -> np.ndarray:
+    words = _WORD.findall((text or "").lower())
+    shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    digests = b"".join(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest() for s in shingles)
+    return np.frombuffer(digests, dtype="<u4").astype(np.uint64) % _PRIME
+
+def minhash(text: str) -> Optional[np.ndarray]:
+    """
+    MinHash signature (NUM_PERMUTATIONS uint32 values) of the word 3-gram shingles of a text.
+    The share of equal positions in two signatures estimates the Jaccard similarity of the texts.
+    Returns None for texts too short to shingle.
+    """
+    hashes = _shingle_hashes(text)
+    if not len(hashes):
+        return None
+    # (a * x + b) mod p for every permutation / shingle pair; a, x < 2^31 so nothing overflows
+    permuted = (np.outer(_A, hashes) + _B[:, None]) % _PRIME
+    return permuted.min(axis=1).astype(np.uint32)
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.count_nonzero(a == b)) / len(a)
+
+def encode_signature(signature: Optional[np.ndarray]) -> Optional[str]:
+    if signature is None:
+        return None
+    return base64.b64encode(np.asarray(signature, dtype="<u4").tobytes()).decode("ascii")
+
+def decode_signature(value: Optional[str]) -> Optional[np.ndarray]:
+    if not value:
+        return None
+    try:
+        signature = np.frombuffer(base64.b64decode(value), dtype="<u4")
+    except (ValueError, TypeError):
+        return None
+    return signature if len(signature) == NUM_PERMUTATIONS else None
+
+def text_signature(text: str) -> Optional[str]:
+    """Encoded MinHash signature as stored in news.minhash."""
+    return encode_signature(minhash(text))
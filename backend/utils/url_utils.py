@@ -0,0 +1,106 @@
+"""
+Article URL canonicalisation for duplicate detection.
+
+Regression check against the outlet URLs in fixtures/canonical_urls.json:
+    python -m utils.url_utils
+"""
+import os
+import re
+import sys
+import json
+from typing import Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "igshid", "mc_cid", "mc_eid",
+    "ref", "ref_src", "utm", "_ga", "amp",
+}
+TRACKING_PREFIXES = ("utm_", "ga_", "pk_", "mtm_")
+
+# Hosts such as m.detik.com / mobile.kompas.com / amp.kompas.com serve the same article
+MOBILE_HOST_PREFIXES = ("www.", "m.", "mobile.", "amp.")
+
+# Page URLs built by services.scraping pagination for pages 2-49: Sindo-style "/2" after an
+# article slug, "-2.html" page files and "?page=2". The same shapes occur in real article
+# URLs ("berita-covid-19.html", ".../ktt-g/20"), so they are never stripped blindly.
+PAGE_SUFFIX = re.compile(r"(/[^/]*[a-z][^/]*-[^/]*)/([2-9]|[1-4]\d)$")
+PAGE_FILE_SUFFIX = re.compile(r"-([2-9]|[1-4]\d)(\.html?)$")
+PAGE_NUMBER = re.compile(r"[2-9]|[1-4]\d")
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalises an article URL so re-submissions of the same article map to one key:
+    lowercases scheme and host, drops www/mobile/AMP host prefixes, AMP path
+    segments, tracking query parameters, fragments and trailing slashes.
+    Pagination suffixes are kept; see page_base_url().
+    """
+    url = (url or "").strip()
+    if not url:
+        return ""
+    parts = urlsplit(url)
+    scheme = "https" if parts.scheme in ("http", "https", "") else parts.scheme.lower()
+
+    host = parts.netloc.lower()
+    if host.endswith(":80") or host.endswith(":443"):
+        host = host.rsplit(":", 1)[0]
+    stripped = True
+    while stripped:
+        stripped = False
+        for prefix in MOBILE_HOST_PREFIXES:
+            if host.startswith(prefix) and host.count(".") > 1:
+                host = host[len(prefix):]
+                stripped = True
+
+    path = parts.path or "/"
+    segments = [s for s in path.split("/") if s and s.lower() not in ("amp", "amp.html")]
+    path = "/" + "/".join(segments)
+    if path.endswith(".amp"):
+        path = path[:-4]
+    path = path.rstrip("/") or "/"
+
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PREFIXES)
+    ]
+    query.sort()
+
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+def page_base_url(canonical: str) -> Optional[str]:
+    """
+    For a canonical URL shaped like a pagination page (".../slug/2", "...-2.html",
+    "?page=2"), the canonical URL of its first page; None otherwise. The result is
+    only a candidate: callers treat the URL as a page of a known article when that
+    base URL is already stored, never as a key of its own.
+    """
+    if not canonical:
+        return None
+    parts = urlsplit(canonical)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    base_query = [(k, v) for k, v in query if not (k == "page" and PAGE_NUMBER.fullmatch(v))]
+    path = parts.path
+    if len(base_query) == len(query):
+        path = PAGE_SUFFIX.sub(r"\1", PAGE_FILE_SUFFIX.sub(r"\2", path))
+    base = urlunsplit((parts.scheme, parts.netloc, path, urlencode(base_query), ""))
+    return base if base != canonical else None
+
+FIXTURE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "fixtures", "canonical_urls.json")
+
+def verify() -> bool:
+    with open(FIXTURE_PATH, encoding="utf-8") as f:
+        cases = json.load(f)
+    ok = True
+    for case in cases:
+        canonical = canonicalize_url(case["url"])
+        problems = []
+        if canonical != case["canonical"]:
+            problems.append(f"canonical {canonical!r}")
+        if page_base_url(canonical) != case.get("page_base"):
+            problems.append(f"page base {page_base_url(canonical)!r}")
+        print(f"{'✅' if not problems else '❌'} {case['url']}: {', '.join(problems) or 'ok'}")
+        ok = ok and not problems
+    return ok
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)